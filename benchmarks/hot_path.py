@@ -0,0 +1,294 @@
+"""Tick-to-signal hot path on synthetic data, no network needed.
+
+    python benchmarks/hot_path.py --ticks 200000 --save benchmarks/baseline.json
+    python benchmarks/hot_path.py --compare benchmarks/baseline.json
+
+Benchmarks:
+    on_data      SmartWebSocketV2-shaped ticks through OptionTrader.on_data
+                 (store update, ATM tracking, ladder, entry check)
+    ladder       Underlying.update_ladder over the ranged strikes
+    atm_shift    an index tick that moves the ATM (tokens + subscriptions)
+    signal       Underlying.build_trade_signal
+    replicator   Replicator.execute, master and children on a fake transport
+
+Each one reports ops/sec, p50/p99/max latency and, in a second pass under
+tracemalloc, the peak traced memory and the allocations per op: memory
+blocks the ops left allocated, from the line-grouped snapshot diff.
+--compare exits 1 when a p99, throughput or allocation count is worse than
+the baseline by more than --tolerance. benchmarks/baseline.json was
+recorded on the machine named in its "machine" field; timings only
+compare against a baseline from the same machine, save a new one first
+anywhere else.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.chain_index import ChainIndex  # noqa: E402
+from core.options_main import OptionTrader  # noqa: E402
+from core.TradeReplicator import Replicator  # noqa: E402
+from core.tick_log import ReplayFeed  # noqa: E402
+
+EXPIRIES = ["06NOV25", "13NOV25", "20NOV25"]
+STRIKES = np.arange(22000, 28001, 50, dtype=np.int64)
+FIRST_TOKEN = 40000
+SPOT = 25000.0
+
+
+def synthetic_chain():
+    shape = (len(EXPIRIES), len(STRIKES), 2)
+    tokens = FIRST_TOKEN + np.arange(np.prod(shape), dtype=np.int64).reshape(shape)
+    symbols = np.empty(shape, dtype=object)
+    for e, expiry in enumerate(EXPIRIES):
+        for s, strike in enumerate(STRIKES):
+            symbols[e, s, 0] = f"NIFTY{expiry}{strike}CE"
+            symbols[e, s, 1] = f"NIFTY{expiry}{strike}PE"
+    return ChainIndex(EXPIRIES, STRIKES, tokens, symbols)
+
+
+def make_trader():
+    env = tempfile.NamedTemporaryFile("w", suffix=".env", delete=False)
+    env.write("CLIENT=BENCH\nAPI=bench\nPIN=0000\nTOTP=JBSWY3DPEHPK3PXP\nIP=127.0.0.1\n")
+    env.close()
+    trader = OptionTrader(env.name)
+    os.unlink(env.name)
+    trader.set_chains({"NIFTY": (synthetic_chain(), list(EXPIRIES), {}, 65)})
+    trader.sws = ReplayFeed()
+    trader.health.on_connect()
+    trader.AUTH_TOKEN, trader.FEED_TOKEN = "Bearer bench", "bench"
+    trader.on_trade_signal = lambda signal: None
+    return trader
+
+
+def option_price(spot, strike, side):
+    intrinsic = max(spot - strike, 0) if side == 0 else max(strike - spot, 0)
+    return intrinsic + 120 * np.exp(-abs(spot - strike) / 400)
+
+
+def synthetic_ticks(count, chain, index_every=20, seed=7):
+    """Index ticks random-walk the spot, option ticks hit strikes around it."""
+    rng = random.Random(seed)
+    spot = SPOT
+    messages = []
+    ts = 1_700_000_000_000
+    for seq in range(count):
+        ts += 5
+        if seq % index_every == 0:
+            spot += rng.gauss(0, 4)
+            messages.append({
+                "subscription_mode": 2, "exchange_type": 1, "token": "99926000",
+                "sequence_number": seq, "exchange_timestamp": ts,
+                "last_traded_price": int(spot * 100), "closed_price": int(SPOT * 100),
+            })
+            continue
+        atm = int(np.ceil(spot / 50) * 50)
+        strike = atm + 50 * rng.randint(-5, 5)
+        s = int(np.searchsorted(chain.strikes, strike))
+        side = rng.randint(0, 1)
+        price = option_price(spot, strike, side) + rng.gauss(0, 0.5)
+        messages.append({
+            "subscription_mode": 1, "exchange_type": 2, "token": chain.token_str[0, s, side],
+            "sequence_number": seq, "exchange_timestamp": ts,
+            "last_traded_price": int(max(price, 0.05) * 100),
+        })
+    return messages
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.status_code = 200
+        self.payload = payload
+        self.content = json.dumps(payload).encode()
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Answers like flask_server after `delay` seconds."""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.orderid = 0
+
+    def post(self, url, json=None, timeout=None):
+        if self.delay:
+            time.sleep(self.delay)
+        legs = json.get("legs") or [json]
+        results = []
+        for leg in legs:
+            self.orderid += 1
+            results.append({"symbol": leg.get("symbol"), "status": 200,
+                            "response": {"status": True, "data": {"orderid": str(self.orderid)}}})
+        if url.endswith("/placeOrders"):
+            return FakeResponse({"strategy": json.get("startergy"), "results": results})
+        return FakeResponse(results[0]["response"])
+
+    def get(self, url, timeout=None):
+        return FakeResponse({})
+
+    def close(self):
+        pass
+
+
+def make_replicator(children, delay):
+    master = SimpleNamespace(place_order=lambda symbol, token, B_S, quantity: "1")
+    kids = [SimpleNamespace(CLIENT=f"C{i}", API="bench", AUTH_TOKEN="bench", IP=f"10.0.0.{i + 1}")
+            for i in range(children)]
+    rep = Replicator(master, kids)
+    rep.sessions = {k.IP: FakeSession(delay) for k in kids}
+    return rep
+
+
+def timed(fn, n):
+    samples = np.empty(n)
+    clock = time.perf_counter
+    start = clock()
+    for i in range(n):
+        t0 = clock()
+        fn(i)
+        samples[i] = clock() - t0
+    total = clock() - start
+    return {
+        "ops": n,
+        "ops_per_sec": n / total if total else float("inf"),
+        "p50_us": float(np.percentile(samples, 50) * 1e6),
+        "p99_us": float(np.percentile(samples, 99) * 1e6),
+        "max_us": float(samples.max() * 1e6),
+    }
+
+
+def allocations(fn, n):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    for i in range(n):
+        fn(i)
+    peak = tracemalloc.get_traced_memory()[1]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # per line, so a free in one place can't hide an allocation in another
+    # of the same file
+    diff = after.compare_to(before, "lineno")
+    allocs = sum(s.count_diff for s in diff if s.count_diff > 0)
+    return {
+        "peak_alloc_kb": (peak - base) / 1024,
+        "allocs_per_op": allocs / n,
+    }
+
+
+def run(ticks, children, child_delay, repeat):
+    trader = make_trader()
+    u = trader.underlying
+    messages = synthetic_ticks(ticks, u.chain)
+    n_msg = len(messages)
+
+    def on_data(i):
+        trader.on_data(None, messages[i % n_msg])
+
+    # warm the store and ATM before measuring
+    for m in messages[:1000]:
+        trader.on_data(None, m)
+
+    def ladder(i):
+        u.dirty_strikes.add(u.current_atm)
+        u.update_ladder()
+
+    atm_prices = (SPOT + 10, SPOT + 60)
+
+    def atm_shift(i):
+        u.on_index_tick(atm_prices[i % 2])
+        trader.flush_subscriptions()
+
+    def signal(i):
+        u.build_trade_signal([], "SELL")
+
+    rep = make_replicator(children, child_delay)
+    sig = u.build_trade_signal([], "SELL")
+
+    def replicate(i):
+        rep.execute(sig, force=True)
+
+    benches = {
+        "on_data": (on_data, ticks),
+        "ladder": (ladder, repeat),
+        "atm_shift": (atm_shift, repeat),
+        "signal": (signal, repeat),
+        "replicator": (replicate, max(1, repeat // 50)),
+    }
+    results = {}
+    for name, (fn, n) in benches.items():
+        results[name] = timed(fn, n)
+        results[name].update(allocations(fn, min(n, 2000)))
+    rep.close()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        now = results.get(name)
+        if not now:
+            continue
+        if now["p99_us"] > base["p99_us"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {base['p99_us']:.1f} -> {now['p99_us']:.1f} us")
+        if now["ops_per_sec"] < base["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: {base['ops_per_sec']:.0f} -> {now['ops_per_sec']:.0f} ops/s")
+        if "allocs_per_op" in base and now["allocs_per_op"] > base["allocs_per_op"] * (1 + tolerance) + 0.5:
+            regressions.append(f"{name}: {base['allocs_per_op']:.2f} -> {now['allocs_per_op']:.2f} allocs/op")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ticks", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5_000, help="iterations of the non-tick benches")
+    parser.add_argument("--children", type=int, default=8)
+    parser.add_argument("--child-delay-ms", type=float, default=0.0, help="simulated relay round trip")
+    parser.add_argument("--save", help="write results as a baseline json")
+    parser.add_argument("--compare", help="baseline json to check against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = run(args.ticks, args.children, args.child_delay_ms / 1000, args.repeat)
+    print(f"{'bench':12} {'ops/s':>12} {'p50 us':>9} {'p99 us':>9} {'max us':>10} "
+          f"{'peak KB':>9} {'allocs/op':>10}")
+    for name, r in results.items():
+        print(f"{name:12} {r['ops_per_sec']:12.0f} {r['p50_us']:9.1f} {r['p99_us']:9.1f} "
+              f"{r['max_us']:10.1f} {r['peak_alloc_kb']:9.1f} {r['allocs_per_op']:10.2f}")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                       "python": sys.version.split()[0],
+                       "machine": {"node": platform.node(), "platform": platform.platform(),
+                                   "processor": platform.processor() or platform.machine(),
+                                   "cpus": os.cpu_count()},
+                       "args": vars(args), "results": results}, file, indent=2)
+        print(f"baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
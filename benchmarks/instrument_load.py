@@ -0,0 +1,87 @@
+"""Startup cost of the instrument master, old json path vs the columnar cache.
+
+    python benchmarks/instrument_load.py --source OpenAPIScripMaster.json
+
+Every measurement runs in a fresh interpreter so peak RSS is per run.
+`cold` starts with no cache on disk, `warm` reuses the one the cold run left.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def legacy_load(source, workdir):
+    # the pre-cache implementation: full json in, indent=4 json out,
+    # DataFrame of every instrument, then filter
+    import pandas as pd
+    from bidict import bidict
+
+    path = os.path.join(workdir, "tickers.json")
+    if os.path.exists(path):
+        with open(path) as file:
+            instrument_list = json.load(file)
+    else:
+        with open(source) as file:
+            instrument_list = json.load(file)
+        with open(path, "w") as file:
+            json.dump(instrument_list, file, indent=4)
+    df = pd.DataFrame(instrument_list)
+    df = df[(df['name'] == "NIFTY") & (df['instrumenttype'] == "OPTIDX")].copy()
+    df["expiry"] = pd.to_datetime(df['expiry'], format="%d%b%Y")
+    df['strike'] = df['strike'].astype(float) / 100
+    return bidict(zip(df['symbol'], df['token']))
+
+
+def cache_load(source, workdir):
+    from utils.load_instrument_token import load_options_token
+    return load_options_token(path=os.path.join(workdir, "cache"), source=source)
+
+
+def run_one(kind, source, workdir):
+    start = time.perf_counter()
+    (legacy_load if kind == "legacy" else cache_load)(source, workdir)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": elapsed, "peak_rss_mb": peak}))
+
+
+def measure(kind, source, workdir):
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", kind, "--source", source, "--workdir", workdir],
+        check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", required=True, help="local copy of OpenAPIScripMaster.json")
+    parser.add_argument("--child")
+    parser.add_argument("--workdir")
+    args = parser.parse_args()
+    source = os.path.abspath(args.source)
+
+    if args.child:
+        run_one(args.child, source, args.workdir)
+        return
+
+    for kind in ("legacy", "cache"):
+        workdir = tempfile.mkdtemp(prefix=f"instr_{kind}_")
+        try:
+            for phase in ("cold", "warm"):
+                r = measure(kind, source, workdir)
+                print(f"{kind:7} {phase:5} {r['seconds']:8.2f}s  peak rss {r['peak_rss_mb']:8.1f} MB")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Local stand-ins for the Angel One order API and the flask_server relay.
+
+    python benchmarks/mock_angel.py broker --port 7000 --latency-ms 25
+    python benchmarks/mock_angel.py relay --port 6000 --broker http://127.0.0.1:7000
+
+The broker answers placeOrder like SmartAPI does after a configurable
+latency. The relay speaks flask_server's /placeOrder, /placeOrders and
+/test. The real relay can be pointed at the mock broker instead with
+ANGEL_ORDER_URL=http://127.0.0.1:7000/rest/secure/angelbroking/order/v1/placeOrder.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import threading
+
+from aiohttp import web, ClientSession, TCPConnector
+
+ORDER_PATH = "/rest/secure/angelbroking/order/v1/placeOrder"
+
+
+def broker_app(latency=0.02, jitter=0.005):
+    orderids = itertools.count(250000000000001)
+    app = web.Application()
+    app["placed"] = 0
+
+    async def place_order(request):
+        # flask_server sends the order as query params, SmartConnect as json
+        params = dict(request.query)
+        if request.can_read_body:
+            try:
+                params.update(await request.json())
+            except Exception:
+                pass
+        delay = max(0.0, random.gauss(latency, jitter)) if latency else 0
+        if delay:
+            await asyncio.sleep(delay)
+        app["placed"] += 1
+        orderid = str(next(orderids))
+        return web.json_response({
+            "status": True, "message": "SUCCESS", "errorcode": "",
+            "data": {"script": params.get("tradingsymbol"), "orderid": orderid,
+                     "uniqueorderid": f"mock-{orderid}"},
+        })
+
+    app.router.add_post(ORDER_PATH, place_order)
+    return app
+
+
+def relay_app(broker_url):
+    app = web.Application()
+    order_url = broker_url.rstrip("/") + ORDER_PATH
+
+    async def open_session(app):
+        app["session"] = ClientSession(connector=TCPConnector(limit=0))
+
+    async def close_session(app):
+        await app["session"].close()
+
+    async def send_order(data):
+        headers = {"Authorization": data.get("AUTH_TOKEN") or "", "X-PrivateKey": data.get("API") or ""}
+        params = {"tradingsymbol": data.get("symbol"), "symboltoken": data.get("token"),
+                  "transactiontype": data.get("B_S"), "quantity": str(data["quantity"])}
+        async with app["session"].post(order_url, headers=headers, params=params) as r:
+            return r.status, await r.json()
+
+    async def place_order(request):
+        status, body = await send_order(await request.json())
+        return web.json_response(body, status=status)
+
+    async def place_orders(request):
+        data = await request.json()
+        legs = [dict(leg, API=leg.get("API") or data.get("API"),
+                     AUTH_TOKEN=leg.get("AUTH_TOKEN") or data.get("AUTH_TOKEN"))
+                for leg in data.get("legs", [])]
+        answers = await asyncio.gather(*(send_order(leg) for leg in legs), return_exceptions=True)
+        results = []
+        for leg, answer in zip(legs, answers):
+            result = {"symbol": leg.get("symbol"), "token": leg.get("token"), "B_S": leg.get("B_S")}
+            if isinstance(answer, Exception):
+                result.update(status=None, response=repr(answer))
+            else:
+                result.update(status=answer[0], response=answer[1])
+            results.append(result)
+        return web.json_response({"strategy": data.get("startergy"), "results": results})
+
+    async def test(request):
+        return web.Response(text="Hellloo World")
+
+    app.on_startup.append(open_session)
+    app.on_cleanup.append(close_session)
+    app.router.add_post("/placeOrder", place_order)
+    app.router.add_post("/placeOrders", place_orders)
+    app.router.add_get("/test", test)
+    return app
+
+
+class Servers:
+    """Runs aiohttp apps on one background event loop."""
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True, name="mock-angel")
+        self.thread.start()
+        self.runners = []
+
+    def add(self, app, port, host="127.0.0.1"):
+        async def start():
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, host, port, backlog=1024).start()
+            self.runners.append(runner)
+        asyncio.run_coroutine_threadsafe(start(), self.loop).result()
+
+    def stop(self):
+        async def cleanup():
+            for runner in self.runners:
+                await runner.cleanup()
+        asyncio.run_coroutine_threadsafe(cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    bp = sub.add_parser("broker")
+    bp.add_argument("--port", type=int, default=7000)
+    bp.add_argument("--latency-ms", type=float, default=20)
+    bp.add_argument("--jitter-ms", type=float, default=5)
+    rp = sub.add_parser("relay")
+    rp.add_argument("--port", type=int, default=6000)
+    rp.add_argument("--broker", default="http://127.0.0.1:7000")
+    args = parser.parse_args()
+
+    if args.cmd == "broker":
+        web.run_app(broker_app(args.latency_ms / 1000, args.jitter_ms / 1000),
+                    host="127.0.0.1", port=args.port, access_log=None)
+    else:
+        web.run_app(relay_app(args.broker), host="0.0.0.0", port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Fan-out completion time against the number of child accounts.
+
+    python benchmarks/replication_load.py --accounts 10,50,100,200,500
+    python benchmarks/replication_load.py --engine threads --relay flask
+
+Everything runs on this box: a mock Angel One order endpoint, a relay (the
+mock one, or the real flask_server.py pointed at the mock broker), and the
+replication engine with every child account on 127.0.0.1. Each round sends
+one two-leg signal and measures until the last child acknowledged.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from types import SimpleNamespace
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_angel import Servers, broker_app, relay_app, ORDER_PATH  # noqa: E402
+from core.async_replicator import AsyncReplicator  # noqa: E402
+from core.TradeReplicator import Replicator  # noqa: E402
+
+SIGNAL = {
+    "startergy": "ATM_DIFF_SELL",
+    "underlying": "NIFTY",
+    "legs": [
+        {"symbol": "NIFTY06NOV2525000CE", "token": "40001", "B_S": "SELL", "quantity": "65"},
+        {"symbol": "NIFTY06NOV2525000PE", "token": "40002", "B_S": "SELL", "quantity": "65"},
+    ],
+}
+
+
+def wait_ready(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/test", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"relay on port {port} did not come up")
+
+
+def start_relay(kind, servers, port, broker_port):
+    broker_url = f"http://127.0.0.1:{broker_port}"
+    if kind == "mock":
+        servers.add(relay_app(broker_url), port)
+        return None
+    env = dict(os.environ, ANGEL_ORDER_URL=broker_url + ORDER_PATH, RELAY_PORT=str(port))
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "flask_server.py")], env=env,
+                            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_ready(port)
+    return proc
+
+
+def make_engine(kind, children, port, concurrency):
+    master = SimpleNamespace(place_order=lambda symbol, token, B_S, quantity: "1")
+    if kind == "async":
+        return AsyncReplicator(master, children, max_concurrency=concurrency, port=port)
+    return Replicator(master, children, max_workers=concurrency, port=port)
+
+
+def run_rounds(engine, rounds):
+    fan_out, wall, errors = [], [], 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = engine.execute(dict(SIGNAL), force=True)
+        if hasattr(result, "result"):
+            result.result()
+        wall.append((time.perf_counter() - start) * 1000)
+        report = engine.last_report
+        fan_out.append(max(r["ack_ms"] for r in report) if report else float("nan"))
+        errors += sum(1 for r in report if r["status"] != 200)
+    return np.array(fan_out), np.array(wall), errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", default="10,50,100,200")
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--engine", choices=("async", "threads"), default="async")
+    parser.add_argument("--relay", choices=("mock", "flask"), default="mock")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=20, help="mock broker latency")
+    parser.add_argument("--relay-port", type=int, default=16000)
+    parser.add_argument("--broker-port", type=int, default=17000)
+    args = parser.parse_args()
+
+    servers = Servers()
+    servers.add(broker_app(args.latency_ms / 1000), args.broker_port)
+    proc = start_relay(args.relay, servers, args.relay_port, args.broker_port)
+    try:
+        print(f"engine {args.engine}, relay {args.relay}, broker {args.latency_ms:.0f} ms, "
+              f"concurrency {args.concurrency}")
+        print(f"{'accounts':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'wall p99':>9} {'errors':>7}")
+        for count in (int(x) for x in args.accounts.split(",")):
+            children = [SimpleNamespace(CLIENT=f"C{i}", API="mock", AUTH_TOKEN="mock", IP="127.0.0.1")
+                        for i in range(count)]
+            engine = make_engine(args.engine, children, args.relay_port, args.concurrency)
+            try:
+                engine.warm_up()
+                run_rounds(engine, 2)
+                fan_out, wall, errors = run_rounds(engine, args.rounds)
+            finally:
+                engine.close()
+            print(f"{count:8d} {np.percentile(fan_out, 50):9.1f} {np.percentile(fan_out, 99):9.1f} "
+                  f"{fan_out.max():9.1f} {np.percentile(wall, 99):9.1f} {errors:7d}")
+    finally:
+        if proc is not None:
+            proc.terminate()
+        servers.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ class ChildTrader:
         self.TOTP_Secret = os.getenv('TOTP')
         self.obj = SmartConnect(api_key=self.API,disable_ssl=True)
         self.name = None
+        self.order_tracker = None
 
         
     def authenticate(self):
@@ -27,7 +28,8 @@ class ChildTrader:
         rms = self.obj.rmsLimit()
         return rms['data']['availablecash']
     
-    def place_sell_order(self,symbol,token):    
+    def place_sell_order(self,symbol,token,quantity):
+        """quantity: the trade signal leg's, i.e. the underlying's lot or the caller's size."""
         try:
             orderparams = {
                 "variety": "NORMAL",
@@ -39,14 +41,17 @@ class ChildTrader:
                 "producttype": "INTRADAY",
                 "duration": "DAY",
                 "price": "0", 
-                "quantity": "65"    
+                "quantity": str(quantity)
             }
 
             orderid = self.obj.placeOrder(orderparams)
+            if not orderid:
+                logger.error(f"Order placement failed for {self.name}: {symbol} SELL, no order id")
+                return None
             logger.info(f"Order placed successfully for {self.name}, Order ID: {orderid}")
-            book = self.obj.orderBook()
-            order_response = book['data'][0]['text']
-            logger.info(f"{self.name}: {order_response}")
+            if self.order_tracker is not None:
+                self.order_tracker.track(self, orderid, symbol=symbol, token=token, B_S="SELL", quantity=str(quantity))
+            return orderid
 
         except Exception as e:
             print(f"Order placement failed: {e}")
\ No newline at end of file
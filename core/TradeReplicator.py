@@ -1,55 +1,193 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
+from core.metrics import METRICS
+from requests.adapters import HTTPAdapter
+from datetime import date
+import json
+import time
 import requests
 
+CHILD_PORT = 6000
+
+
+def trade_key(trade_signal):
+    """One automatic trade per underlying per trading day, across instrument rollovers."""
+    return (trade_signal.get("underlying"), date.today())
+
+
 class Replicator:
-    def __init__(self,master,children,logger=None):
+    def __init__(self,master,children,logger=None,concurrent=True,batch=True,max_workers=None,timeout=5.0,port=CHILD_PORT):
         self.master = master
         self.children = children
         self.lock = Lock()
-        self.executed = False
+        # underlyings whose auto trade already went out
+        self.executed = set()
         self.log = logger or (lambda msg: None)
-    
+
+        # concurrent mode: every child leg goes out at once over a
+        # keep-alive session per child IP
+        self.concurrent = concurrent
+        # batch mode: one /placeOrders request per child carrying every leg
+        self.batch = batch
+        self.timeout = timeout
+        self.port = port
+        self.sessions = {}
+        for child in children:
+            if child.IP not in self.sessions:
+                self.sessions[child.IP] = self._new_session()
+        workers = max_workers or max(4, 2 * len(children))
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="replicator")
+        self.last_report = []
+        # optional OrderStateTable, child order ids from the relay go in here
+        self.orders = None
+
     def _log(self,msg):
         self.log(msg)
-        
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+        session.mount("http://", adapter)
+        return session
+
+    def warm_up(self):
+        """Open the keep-alive connections before a signal needs them."""
+        def ping(ip, session):
+            try:
+                session.get(f'http://{ip}:{self.port}/test', timeout=self.timeout)
+            except Exception as e:
+                self._log(f"warm up failed for {ip}: {e!r}")
+        for f in [self.pool.submit(ping, ip, s) for ip, s in self.sessions.items()]:
+            f.result()
+
+    def _send_leg(self, child, leg, start):
+        leg = dict(leg, API=child.API, AUTH_TOKEN=child.AUTH_TOKEN)
+        session = self.sessions.get(child.IP) or self._new_session()
+        dispatched = time.perf_counter()
+        try:
+            r = session.post(f'http://{child.IP}:{self.port}/placeOrder', json=leg, timeout=self.timeout)
+            result, content = r.status_code, r.content
+        except Exception as e:
+            result, content = None, repr(e)
+        acked = time.perf_counter()
+        METRICS.record("child_send", dispatched - start)
+        METRICS.record("child_response", acked - dispatched)
+        return {
+            "client": child.CLIENT,
+            "symbol": leg.get("symbol"),
+            "token": leg.get("token"),
+            "B_S": leg.get("B_S"),
+            "quantity": leg.get("quantity"),
+            "status": result,
+            "content": content,
+            "dispatch_ms": (dispatched - start) * 1000,
+            "ack_ms": (acked - start) * 1000,
+        }
+
+    def _send_batch(self, child, trade_signal, start):
+        body = {
+            "startergy": trade_signal.get("startergy"),
+            "API": child.API,
+            "AUTH_TOKEN": child.AUTH_TOKEN,
+            "legs": [{k: v for k, v in leg.items() if k not in ("API", "AUTH_TOKEN")}
+                     for leg in trade_signal['legs']],
+        }
+        session = self.sessions.get(child.IP) or self._new_session()
+        dispatched = time.perf_counter()
+        try:
+            r = session.post(f'http://{child.IP}:{self.port}/placeOrders', json=body, timeout=self.timeout)
+            results = r.json()["results"]
+        except Exception as e:
+            results = [{"symbol": leg.get("symbol"), "status": None, "response": repr(e)}
+                       for leg in trade_signal['legs']]
+        acked = time.perf_counter()
+        METRICS.record("child_send", dispatched - start)
+        METRICS.record("child_response", acked - dispatched)
+        legs = {leg.get("symbol"): leg for leg in trade_signal['legs']}
+        return [{
+            "client": child.CLIENT,
+            "symbol": res.get("symbol"),
+            **{k: legs.get(res.get("symbol"), {}).get(k) for k in ("token", "B_S", "quantity")},
+            "status": res.get("status"),
+            "content": res.get("response"),
+            "dispatch_ms": (dispatched - start) * 1000,
+            "ack_ms": (acked - start) * 1000,
+        } for res in results]
+
+    def _record_child_order(self, r):
+        content = r["content"]
+        try:
+            if isinstance(content, (bytes, str)):
+                content = json.loads(content)
+            orderid = content["data"]["orderid"]
+        except Exception:
+            return
+        self.orders.placed(r["client"], orderid, symbol=r["symbol"], token=r.get("token"),
+                           B_S=r.get("B_S"), quantity=r.get("quantity"))
+
+    def _fan_out(self, trade_signal):
+        start = time.perf_counter()
+        if self.batch:
+            jobs = [(self._send_batch, child, trade_signal) for child in self.children]
+        else:
+            jobs = [(lambda c, l, s: [self._send_leg(c, l, s)], child, leg)
+                    for child in self.children for leg in trade_signal['legs']]
+        if not self.concurrent:
+            report = [r for fn, a, b in jobs for r in fn(a, b, start)]
+        else:
+            futures = [self.pool.submit(fn, a, b, start) for fn, a, b in jobs]
+            report = [r for f in as_completed(futures) for r in f.result()]
+        for r in report:
+            if self.orders is not None:
+                self._record_child_order(r)
+            self._log(r["content"])
+            self._log(f"{r['client']} {r['symbol']}: status {r['status']} "
+                      f"dispatch +{r['dispatch_ms']:.1f} ms, ack +{r['ack_ms']:.1f} ms")
+        if report:
+            worst = max(r["ack_ms"] for r in report)
+            self._log(f"Children done, last ack +{worst:.1f} ms after master")
+        self.last_report = report
+        return report
+
     def execute(self,trade_signal,force=False):
+        start = time.perf_counter()
+        if trade_signal.get("signal_ts"):
+            METRICS.record("signal_to_execute", start - trade_signal["signal_ts"])
         with self.lock:
-            if self.executed and not force:
+            key = trade_key(trade_signal)
+            if key in self.executed and not force:
                 self._log("trade already executed Ignoring..")
                 return
             self._log("Executing in master first")
-            
-            
+
+
             for leg in trade_signal['legs']:
                 self.master.place_order(leg['symbol'],leg['token'],leg['B_S'],leg['quantity'])
             self.log("Master done")
-            
-            for child in self.children:
-                for leg in trade_signal['legs']:
-                    leg['API'] = child.API
-                    leg['AUTH_TOKEN'] = child.AUTH_TOKEN
-                    r = requests.post(f'http://{child.IP}:6000/placeOrder',json=leg)
-                    self._log(r.content)
+            METRICS.since("master_legs", start)
+
+            self._fan_out(trade_signal)
+            METRICS.since("execute_total", start)
             if not force:
-                self.executed = True
-        
+                self.executed.add(key)
+
     def test(self,trade_signal,force=False):
         with self.lock:
-            if self.executed and not force:
+            key = trade_key(trade_signal)
+            if key in self.executed and not force:
                 self._log("trade already executed Ignoring..")
                 return
             self._log("Executing in master first")
-            
+
             for leg in trade_signal['legs']:
                 self._log(f"Placing order in master with args:{leg['symbol']},{leg['token']},{leg['B_S']},{leg['quantity']}")
-                
+
             self._log("Master done")
-            for child in self.children:
-                for leg in trade_signal['legs']:
-                    leg['API'] = child.API
-                    leg['AUTH_TOKEN'] = child.AUTH_TOKEN
-                    r = requests.post(f'http://{child.IP}:6000/placeOrder',json=leg)
-                    self._log(r.content)
-                    # self._log(f"Placing order in Child with args:{leg['symbol']},{leg['token']}")
-            if not force:       
-                self.executed = True
\ No newline at end of file
+            self._fan_out(trade_signal)
+            if not force:
+                self.executed.add(key)
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+        for session in self.sessions.values():
+            session.close()
@@ -0,0 +1,195 @@
+"""
+asyncio replication engine, a drop-in for Replicator.
+
+The fan-out runs on a private event loop thread, so execute() only
+schedules the trade and returns a concurrent.futures.Future; the caller's
+thread (a Textual worker) is never held for the round trips. Every child
+request shares one aiohttp connector and a semaphore of `max_concurrency`,
+so hundreds of accounts go out at once without opening hundreds of sockets.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from core.metrics import METRICS
+from core.TradeReplicator import CHILD_PORT, trade_key
+
+
+class AsyncReplicator:
+    def __init__(self, master, children, logger=None, batch=True, max_concurrency=64,
+                 timeout=5.0, port=CHILD_PORT):
+        self.master = master
+        self.children = children
+        self.log = logger or (lambda msg: None)
+        self.batch = batch
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.port = port
+        # underlyings whose auto trade already went out
+        self.executed = set()
+        self.lock = Lock()
+        self.last_report = []
+        # optional OrderStateTable, child order ids from the relay go in here
+        self.orders = None
+        # master legs go through SmartConnect, which is blocking
+        self.master_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="replicator-master")
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = Thread(target=self.loop.run_forever, daemon=True, name="replicator-loop")
+        self.thread.start()
+        self.session = None
+        self.semaphore = None
+        self._submit(self._open()).result()
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def _open(self):
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=0,
+                                         ttl_dns_cache=300, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(connector=connector,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def _url(self, child, path):
+        return f"http://{child.IP}:{self.port}/{path}"
+
+    def warm_up(self):
+        """Open the keep-alive connections before a signal needs them."""
+        async def ping(child):
+            try:
+                async with self.semaphore, self.session.get(self._url(child, "test")) as r:
+                    await r.read()
+            except Exception as e:
+                self.log(f"warm up failed for {child.IP}: {e!r}")
+
+        async def all_children():
+            seen = {}
+            for child in self.children:
+                seen.setdefault(child.IP, child)
+            await asyncio.gather(*(ping(c) for c in seen.values()))
+        self._submit(all_children()).result()
+
+    async def _post(self, child, path, body, start):
+        async with self.semaphore:
+            dispatched = time.perf_counter()
+            try:
+                async with self.session.post(self._url(child, path), json=body) as r:
+                    status, raw = r.status, await r.read()
+            except Exception as e:
+                status, raw = None, repr(e)
+        acked = time.perf_counter()
+        METRICS.record("child_send", dispatched - start)
+        METRICS.record("child_response", acked - dispatched)
+        return status, raw, (dispatched - start) * 1000, (acked - start) * 1000
+
+    async def _send_leg(self, child, leg, start):
+        leg = dict(leg, API=child.API, AUTH_TOKEN=child.AUTH_TOKEN)
+        status, content, dispatch_ms, ack_ms = await self._post(child, "placeOrder", leg, start)
+        return [{
+            "client": child.CLIENT, "symbol": leg.get("symbol"), "token": leg.get("token"),
+            "B_S": leg.get("B_S"), "quantity": leg.get("quantity"), "status": status,
+            "content": content, "dispatch_ms": dispatch_ms, "ack_ms": ack_ms,
+        }]
+
+    async def _send_batch(self, child, trade_signal, start):
+        body = {
+            "startergy": trade_signal.get("startergy"),
+            "API": child.API,
+            "AUTH_TOKEN": child.AUTH_TOKEN,
+            "legs": [{k: v for k, v in leg.items() if k not in ("API", "AUTH_TOKEN")}
+                     for leg in trade_signal['legs']],
+        }
+        status, raw, dispatch_ms, ack_ms = await self._post(child, "placeOrders", body, start)
+        try:
+            results = json.loads(raw)["results"]
+        except Exception:
+            results = [{"symbol": leg.get("symbol"), "status": None, "response": raw}
+                       for leg in trade_signal['legs']]
+        legs = {leg.get("symbol"): leg for leg in trade_signal['legs']}
+        return [{
+            "client": child.CLIENT, "symbol": res.get("symbol"), "status": res.get("status"),
+            **{k: legs.get(res.get("symbol"), {}).get(k) for k in ("token", "B_S", "quantity")},
+            "content": res.get("response"), "dispatch_ms": dispatch_ms, "ack_ms": ack_ms,
+        } for res in results]
+
+    def _record_child_order(self, r):
+        content = r["content"]
+        try:
+            if isinstance(content, (bytes, str)):
+                content = json.loads(content)
+            orderid = content["data"]["orderid"]
+        except Exception:
+            return
+        self.orders.placed(r["client"], orderid, symbol=r["symbol"], token=r.get("token"),
+                           B_S=r.get("B_S"), quantity=r.get("quantity"))
+
+    async def _fan_out(self, trade_signal):
+        start = time.perf_counter()
+        if self.batch:
+            jobs = [self._send_batch(child, trade_signal, start) for child in self.children]
+        else:
+            jobs = [self._send_leg(child, leg, start)
+                    for child in self.children for leg in trade_signal['legs']]
+        report = [r for rows in await asyncio.gather(*jobs) for r in rows]
+        METRICS.since("fan_out", start)
+        for r in report:
+            if self.orders is not None:
+                self._record_child_order(r)
+            self.log(f"{r['client']} {r['symbol']}: status {r['status']} "
+                     f"dispatch +{r['dispatch_ms']:.1f} ms, ack +{r['ack_ms']:.1f} ms")
+        if report:
+            worst = max(r["ack_ms"] for r in report)
+            self.log(f"Children done, last ack +{worst:.1f} ms after master")
+        self.last_report = report
+        return report
+
+    async def _execute(self, trade_signal, start, dry_run):
+        loop = asyncio.get_running_loop()
+        for leg in trade_signal['legs']:
+            if dry_run:
+                self.log(f"Placing order in master with args:{leg['symbol']},{leg['token']},{leg['B_S']},{leg['quantity']}")
+            else:
+                await loop.run_in_executor(self.master_pool, self.master.place_order,
+                                           leg['symbol'], leg['token'], leg['B_S'], leg['quantity'])
+        self.log("Master done")
+        METRICS.since("master_legs", start)
+        report = await self._fan_out(trade_signal)
+        METRICS.since("execute_total", start)
+        return report
+
+    def _schedule(self, trade_signal, force, dry_run):
+        start = time.perf_counter()
+        if trade_signal.get("signal_ts"):
+            METRICS.record("signal_to_execute", start - trade_signal["signal_ts"])
+        key = trade_key(trade_signal)
+        # only the duplicate check is serialised, not the round trips
+        with self.lock:
+            if key in self.executed and not force:
+                self.log("trade already executed Ignoring..")
+                return None
+            if not force:
+                self.executed.add(key)
+        self.log("Executing in master first")
+        return self._submit(self._execute(trade_signal, start, dry_run))
+
+    def execute(self, trade_signal, force=False):
+        """Schedules the trade; returns a Future of the child report (None if deduplicated)."""
+        return self._schedule(trade_signal, force, dry_run=False)
+
+    def test(self, trade_signal, force=False):
+        return self._schedule(trade_signal, force, dry_run=True)
+
+    def close(self):
+        async def shutdown():
+            await self.session.close()
+        try:
+            self._submit(shutdown()).result(timeout=self.timeout)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.master_pool.shutdown(wait=False)
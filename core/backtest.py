@@ -0,0 +1,153 @@
+"""
+Vectorised backtest of ATM_DIFF_SELL over recorded tick logs.
+
+    python -m core.backtest ticks_*.bin --threshold 1 2 3 5 --step 50 100 --range 0 1 2
+
+The live rule (OptionTrader.check_entry) sells the ATM straddle once a day
+when |CE - PE| <= diff_threshold. Here the same rule runs over whole days
+at once: a forward-filled price matrix per day, ATM for every tick, and the
+first qualifying row found with one argmax per threshold. range_count > 0
+also accepts strikes up to that many steps away from ATM, picking the one
+with the smallest diff. Positions are held to the last tick of the day.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from core.tick_log import load_ticks
+
+
+def load_day(path):
+    """
+    (ticks, meta) for one session. ticks has ts/token/ltp columns; a .bin
+    tick log or any csv with those columns (historical data) works, as long
+    as <path>.tokens.json exists next to it. The sidecar's lot sizes the
+    PnL, so every underlying trades its own lot.
+    """
+    if path.endswith(".csv"):
+        ticks = pd.read_csv(path, dtype={"token": str})
+    else:
+        raw = load_ticks(path)
+        exch_ns = raw["exchange_timestamp"].astype(np.int64) * 1_000_000
+        ticks = pd.DataFrame({
+            "ts": np.where(exch_ns > 0, exch_ns, raw["recv_ns"]),
+            "token": np.char.decode(raw["token"]),
+            "ltp": raw["last_traded_price"] / 100,
+        })
+    with open(f"{path}.tokens.json") as file:
+        meta = json.load(file)
+    return ticks, meta
+
+
+def price_matrix(ticks, meta, expiry=None):
+    """Forward filled (ticks x strikes x side) prices of one expiry plus the spot series."""
+    tokens = meta["tokens"]
+    if expiry is None:
+        seen = {tokens[t][0] for t in ticks["token"].unique() if t in tokens}
+        expiry = min(seen, key=lambda e: pd.to_datetime(e, format="%d%b%y"))
+    chain_tokens = {t: v for t, v in tokens.items() if v[0] == expiry}
+
+    ticks = ticks[ticks["token"].isin(chain_tokens) | (ticks["token"] == meta["spot"])]
+    ticks = ticks.sort_values("ts", kind="stable").reset_index(drop=True)
+    wide = ticks.pivot(columns="token", values="ltp").ffill()
+
+    spot = wide[meta["spot"]].to_numpy() if meta["spot"] in wide else np.full(len(wide), np.nan)
+    strikes = np.array(sorted({v[1] for v in chain_tokens.values()}), dtype=np.int64)
+    prices = np.full((len(wide), len(strikes), 2), np.nan)
+    for token, (_, strike, side) in chain_tokens.items():
+        if token in wide:
+            prices[:, np.searchsorted(strikes, strike), side] = wide[token].to_numpy()
+    return ticks["ts"].to_numpy(), spot, strikes, prices, expiry
+
+
+def run_day(path, thresholds, steps, range_counts, expiry=None, lot=None):
+    """lot overrides the sidecar's; sidecars written before it was recorded need it."""
+    ticks, meta = load_day(path)
+    lot = lot or meta.get("lot")
+    if not lot:
+        raise ValueError(f"{path}.tokens.json has no lot size, pass --lot")
+    ts, spot, strikes, prices, expiry = price_matrix(ticks, meta, expiry)
+    rows = np.arange(len(ts))
+    trades = []
+
+    for step, range_count in product(steps, range_counts):
+        atm = np.ceil(spot / step) * step
+        offsets = np.arange(-range_count, range_count + 1) * step
+        candidates = atm[:, None] + offsets[None, :]                      # ticks x offsets
+        idx = np.searchsorted(strikes, candidates)
+        idx = np.clip(idx, 0, len(strikes) - 1)
+        listed = strikes[idx] == candidates
+        ce = np.where(listed, prices[rows[:, None], idx, 0], np.nan)
+        pe = np.where(listed, prices[rows[:, None], idx, 1], np.nan)
+        diff = np.abs(ce - pe)
+        best = np.argmin(np.where(np.isnan(diff), np.inf, diff), axis=1)
+        best_diff = diff[rows, best]
+
+        for threshold in thresholds:
+            hit = best_diff <= threshold
+            base = {"day": os.path.basename(path), "expiry": expiry,
+                    "threshold": threshold, "step": step, "range_count": range_count}
+            if not hit.any():
+                trades.append({**base, "traded": False, "pnl": 0.0})
+                continue
+            i = int(np.argmax(hit))
+            k = idx[i, best[i]]
+            ce_exit, pe_exit = prices[-1, k, 0], prices[-1, k, 1]
+            credit = ce[i, best[i]] + pe[i, best[i]]
+            trades.append({
+                **base,
+                "traded": True,
+                "entry_ts": int(ts[i]),
+                "strike": int(strikes[k]),
+                "ce_entry": float(ce[i, best[i]]),
+                "pe_entry": float(pe[i, best[i]]),
+                "ce_exit": float(ce_exit),
+                "pe_exit": float(pe_exit),
+                "pnl": float((credit - ce_exit - pe_exit) * lot),
+            })
+    return trades
+
+
+def run(paths, thresholds, steps, range_counts, expiry=None, workers=None, lot=None):
+    """Trades for every day x parameter set, days spread over processes."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_day, p, thresholds, steps, range_counts, expiry, lot) for p in paths]
+        trades = [t for f in futures for t in f.result()]
+    return pd.DataFrame(trades)
+
+
+def summarize(trades):
+    keys = ["threshold", "step", "range_count"]
+    return trades.groupby(keys).agg(
+        days=("day", "nunique"),
+        trades=("traded", "sum"),
+        pnl=("pnl", "sum"),
+        mean_pnl=("pnl", "mean"),
+        worst_day=("pnl", "min"),
+    ).sort_values("pnl", ascending=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="+", help="tick logs or csv files with a .tokens.json sidecar")
+    parser.add_argument("--threshold", type=float, nargs="+", default=[3])
+    parser.add_argument("--step", type=int, nargs="+", default=[50])
+    parser.add_argument("--range", dest="range_count", type=int, nargs="+", default=[0])
+    parser.add_argument("--expiry")
+    parser.add_argument("--lot", type=int, help="for sidecars that don't record the lot size")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--out", help="write the trade list to this csv")
+    args = parser.parse_args()
+
+    trades = run(args.paths, args.threshold, args.step, args.range_count, args.expiry, args.workers, args.lot)
+    if args.out:
+        trades.to_csv(args.out, index=False)
+    print(summarize(trades).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import numpy as np
+
+CE, PE = 0, 1
+
+
+class ChainIndex:
+    """
+    Option chain keyed by integers instead of symbol strings.
+
+    tokens[expiry_idx, strike_idx] -> (CE, PE) token pair, built once when
+    the instrument file is loaded. token_expiry/token_strike/token_side map
+    a token back to its position, so a tick can be placed without parsing.
+    """
+    def __init__(self, expiries, strikes, tokens, symbols):
+        self.expiries = list(expiries)
+        self.expiry_pos = {e: i for i, e in enumerate(self.expiries)}
+        self.strikes = strikes
+        self.tokens = tokens
+        self.symbols = symbols
+        # string form of every token, what the websocket and ltp caches use
+        self.token_str = np.where(tokens > 0, tokens.astype(str), None).astype(object)
+
+        size = int(tokens.max()) + 1 if tokens.size else 1
+        self.token_expiry = np.full(size, -1, dtype=np.int32)
+        self.token_strike = np.full(size, -1, dtype=np.int32)
+        self.token_side = np.full(size, -1, dtype=np.int8)
+        e, s, side = np.nonzero(tokens)
+        flat = tokens[e, s, side]
+        self.token_expiry[flat] = e
+        self.token_strike[flat] = s
+        self.token_side[flat] = side
+
+    @classmethod
+    def from_frame(cls, df, expiry_list):
+        """df: symbol/token/expiry/strike rows of one underlying's options."""
+        expiry_codes = df['expiry'].dt.strftime('%d%b%y').str.upper()
+        pos = {e: i for i, e in enumerate(expiry_list)}
+        df = df[expiry_codes.isin(pos)]
+        expiry_idx = expiry_codes.loc[df.index].map(pos).to_numpy()
+
+        strikes = np.unique(df['strike'].to_numpy().astype(np.int64))
+        strike_idx = np.searchsorted(strikes, df['strike'].to_numpy().astype(np.int64))
+        side = np.where(df['symbol'].str.endswith("CE").to_numpy(), CE, PE)
+
+        tokens = np.zeros((len(expiry_list), len(strikes), 2), dtype=np.int64)
+        symbols = np.full(tokens.shape, None, dtype=object)
+        tokens[expiry_idx, strike_idx, side] = df['token'].astype(np.int64).to_numpy()
+        symbols[expiry_idx, strike_idx, side] = df['symbol'].to_numpy()
+        return cls(expiry_list, strikes, tokens, symbols)
+
+    def strike_pos(self, strike):
+        i = int(np.searchsorted(self.strikes, strike))
+        if i < len(self.strikes) and self.strikes[i] == strike:
+            return i
+        return -1
+
+    def ce_pe(self, expiry_idx, strike):
+        i = self.strike_pos(strike)
+        if i < 0:
+            return None, None
+        ce, pe = self.token_str[expiry_idx, i]
+        return ce, pe
+
+    def window(self, atm, count, step, above=None):
+        """
+        (lo, hi) strike indices covering atm - count*step .. atm + above*step
+        (above defaults to count), the price range the ladder had when its
+        strikes were generated as atm + i*step. strikes is the union over
+        all expiries, so the slice can hold strikes the selected expiry
+        doesn't list; their token pairs are empty.
+        """
+        above = count if above is None else above
+        lo = int(np.searchsorted(self.strikes, atm - count * step, side="left"))
+        hi = int(np.searchsorted(self.strikes, atm + above * step, side="right"))
+        return lo, hi
+
+    def locate(self, token):
+        """(expiry_idx, strike_idx, side) of a token, or None if not in the chain."""
+        t = int(token)
+        if t >= len(self.token_expiry) or self.token_expiry[t] < 0:
+            return None
+        return int(self.token_expiry[t]), int(self.token_strike[t]), int(self.token_side[t])
+
+    def symbol_of(self, token):
+        pos = self.locate(token)
+        if pos is None:
+            return None
+        return self.symbols[pos]
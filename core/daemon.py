@@ -0,0 +1,372 @@
+"""
+Headless trading process with a local control API, no Textual needed.
+
+    python -m core.daemon --config daemon.json
+
+daemon.json:
+    {
+        "master": "home/accounts/master.env",
+        "children": ["home/accounts/child1.env"],
+        "underlyings": ["NIFTY"],
+        "auto_trade": true,
+        "dry_run": true,
+        "replication": "threads",
+        "record": null,
+        "api": {"host": "127.0.0.1", "port": 8700, "token": null}
+    }
+
+dry_run keeps the TUI's current behaviour (Replicator.test: orders are
+logged, not placed); set it to false to trade. The API speaks JSON:
+
+    GET  /status               feed, underlyings, auto trade, latency
+    GET  /ladder?underlying=   ladder rows of one underlying
+    GET  /orders               order state table
+    GET  /positions            net positions and MTM per account
+    GET  /events?since=N       status lines after sequence N
+    POST /order                {"side": "BUY"|"SELL", "strike": 25000,
+                                "legs": "both"|"ce"|"pe", "underlying": ..., "quantity": ...}
+    POST /auto_trade           {"enabled": true|false}
+    POST /expiry               {"expiry": "06NOV25", "underlying": ...}
+
+With api.token set, every request needs `Authorization: Bearer <token>`.
+`python main.py --connect http://127.0.0.1:8700` is a TUI client of it.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from collections import deque
+import argparse
+import json
+import signal as os_signal
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from logzero import logger
+import numpy as np
+
+from core.options_main import OptionTrader
+from core.TradeReplicator import Replicator
+from core.order_status import OrderStateTable, OrderStatusPoller
+from core.order_stream import OrderStream
+from core.metrics import METRICS
+from utils.auth_helper import authenticate_all_concurrent
+
+DAEMON_PORT = 8700
+DEFAULTS = {
+    "children": [],
+    "underlyings": ["NIFTY"],
+    "auto_trade": True,
+    "dry_run": True,
+    "replication": "threads",
+    # tick log path (plus .tokens.json sidecar) for replay and backtests
+    "record": None,
+    "api": {"host": "127.0.0.1", "port": DAEMON_PORT, "token": None},
+}
+
+
+def load_config(path):
+    with open(path) as file:
+        config = {**DEFAULTS, **json.load(file)}
+    config["api"] = {**DEFAULTS["api"], **config.get("api", {})}
+    if not config.get("master"):
+        raise ValueError(f"{path}: 'master' account is required")
+    return config
+
+
+class TradingDaemon:
+    """What TraderApp wires up on mount, without the screen."""
+    def __init__(self, config):
+        self.config = config
+        self.dry_run = config["dry_run"]
+        self.events = deque(maxlen=1000)
+        self.event_seq = 0
+        self.events_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.server = None
+
+        self.trader = OptionTrader(config["master"])
+        self.trader.underlying_names = list(config["underlyings"])
+        self.children = [OptionTrader(path) for path in config["children"]]
+        self.traders = []
+        self.replicator = None
+
+    # ---------- events ----------
+    def log(self, text):
+        text = str(text)
+        logger.info(text)
+        with self.events_lock:
+            self.event_seq += 1
+            self.events.append((self.event_seq, time.time(), text))
+
+    def events_since(self, since=0):
+        with self.events_lock:
+            return [{"seq": s, "ts": ts, "text": t} for s, ts, t in self.events if s > since]
+
+    # ---------- lifecycle ----------
+    def start(self):
+        successes, failures = authenticate_all_concurrent(
+            self.trader, self.children, on_status=self.log,
+            on_result=lambda t, ok, err: self.log(f"{t.CLIENT} auth {'OK' if ok else f'FAIL: {err}'}"))
+        if self.trader not in successes:
+            raise RuntimeError(f"master login failed: {failures.get(self.trader)!r}")
+        self.traders = successes
+        children = successes[1:]
+
+        if self.config["replication"] == "async":
+            from core.async_replicator import AsyncReplicator
+            self.replicator = AsyncReplicator(self.trader, children, logger=self.log)
+        else:
+            self.replicator = Replicator(self.trader, children, logger=self.log)
+        threading.Thread(target=self.replicator.warm_up, daemon=True).start()
+
+        self.orders = OrderStateTable()
+        self.orders.listeners.append(self._on_order_update)
+        self.order_poller = OrderStatusPoller(self.orders)
+        self.order_poller.start()
+        self.trader.order_tracker = self.order_poller
+        self.replicator.orders = self.orders
+        self.positions = self.trader.track_positions(self.orders)
+        self.order_stream = OrderStream(self.orders, on_status=self.log)
+        for t in self.traders:
+            t.open_order_stream(self.order_stream)
+
+        self.trader.auto_trade_enabled = self.config["auto_trade"]
+        self.trader.on_status = self.log
+        self.trader.on_trade_signal = self._on_trade_signal
+        self.trader.restore_snapshot()
+        self.trader.start_rollover()
+        if self.config["record"]:
+            self.trader.start_recording(self.config["record"])
+        threading.Thread(target=self.trader.start_connection, daemon=True, name="feed").start()
+        self.serve(self.config["api"]["host"], self.config["api"]["port"], self.config["api"]["token"])
+
+    def stop(self):
+        self.stop_event.set()
+        self.trader.stop()
+        if self.replicator:
+            self.replicator.close()
+            self.order_poller.stop()
+            self.order_stream.stop()
+        if self.server:
+            self.server.shutdown()
+        METRICS.stop()
+
+    def run_forever(self):
+        os_signal.signal(os_signal.SIGTERM, lambda *_: self.stop_event.set())
+        self.start()
+        try:
+            self.stop_event.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    # ---------- trading ----------
+    def _on_order_update(self, orderid, state):
+        if state.get("status") in ("placed", "open", "pending"):
+            return
+        self.log(f"{state.get('client')} {state.get('symbol')} {orderid}: "
+                 f"{state.get('status')} {state.get('text')}")
+
+    def _on_trade_signal(self, signal, force=False):
+        underlying = self.trader.underlyings.get(signal.get("underlying"), self.trader.underlying)
+        if not force:
+            if not self.trader.auto_trade_enabled:
+                self.log("Auto trading disabled")
+                return
+            if underlying.trade_taken:
+                self.log("Trade already taken")
+                return
+        run = self.replicator.test if self.dry_run else self.replicator.execute
+        threading.Thread(target=run, args=(signal,), kwargs={"force": force}, daemon=True).start()
+        if not force:
+            underlying.trade_taken = True
+
+    def manual_order(self, side, strike=None, legs="both", underlying=None, quantity=None):
+        side = str(side).upper()
+        if side not in ("BUY", "SELL"):
+            raise ValueError("side must be BUY or SELL")
+        u = self.trader.underlyings.get(underlying) if underlying else self.trader.underlying
+        if u is None:
+            raise ValueError(f"unknown underlying {underlying}")
+        strike = int(strike) if strike is not None else u.current_atm
+        if strike is None:
+            raise ValueError("no ATM yet, give a strike")
+        ce, pe = u.get_ce_pe_tokens(strike)
+        tokens = {"both": (ce, pe), "ce": (ce,), "pe": (pe,)}[legs]
+        if not all(tokens):
+            raise ValueError(f"{u.name} {strike} is not listed for {u.expiry}")
+        signal = u.build_trade_signal([*tokens], side, quantity)
+        self._on_trade_signal(signal, force=True)
+        return signal
+
+    def set_auto_trade(self, enabled):
+        self.trader.auto_trade_enabled = bool(enabled)
+        self.log(f"Auto trading {'enabled' if enabled else 'disabled'}")
+        return self.trader.auto_trade_enabled
+
+    def set_expiry(self, expiry, underlying=None):
+        u = self.trader.underlyings.get(underlying) if underlying else self.trader.underlying
+        if u is None or expiry not in u.chain.expiry_pos:
+            raise ValueError(f"unknown expiry {expiry}")
+        with self.trader.tick_lock:
+            rows = u.set_expiry(expiry)
+        self.trader.flush_subscriptions()
+        return rows
+
+    # ---------- views ----------
+    def ladder(self, underlying=None):
+        u = self.trader.underlyings.get(underlying) if underlying else self.trader.underlying
+        if u is None:
+            raise ValueError(f"unknown underlying {underlying}")
+        if u.current_atm is None:
+            return []
+        with self.trader.tick_lock:
+            strikes, ce, pe, diff = u.ladder()
+        seen = ~np.isnan(diff)
+        return [[int(k), float(c), float(p), float(d)]
+                for k, c, p, d in zip(strikes[seen], ce[seen], pe[seen], diff[seen])]
+
+    def status(self):
+        trader = self.trader
+        store = trader.store
+        underlyings = {}
+        for name, u in trader.underlyings.items():
+            spot, ce, pe = store.prices([u.index_token, u.ce_token, u.pe_token])
+            underlyings[name] = {
+                "spot": spot, "atm": u.current_atm, "expiry": u.expiry, "expiries": u.expiry_list,
+                "ce": ce, "pe": pe, "diff": abs(ce - pe) if ce is not None and pe is not None else None,
+                "diff_threshold": u.diff_threshold, "trade_taken": u.trade_taken,
+            }
+        return {
+            "client": trader.CLIENT,
+            "name": trader.name,
+            "accounts": [t.CLIENT for t in self.traders],
+            "auto_trade": trader.auto_trade_enabled,
+            "dry_run": self.dry_run,
+            "feed": {k: v for k, v in trader.health.summary().items() if k != "gaps"},
+            "subscribed": len(trader.subs.tokens()),
+            "underlyings": underlyings,
+            "pending_orders": len(self.orders.pending()),
+            "mtm": dict(zip(self.positions.clients, self.positions.mtm()[1].tolist())),
+            "latency": METRICS.snapshot(),
+            "last_event": self.event_seq,
+        }
+
+    # ---------- API ----------
+    def serve(self, host="127.0.0.1", port=DAEMON_PORT, token=None):
+        daemon = self
+        routes = {
+            ("GET", "/status"): lambda q, body: daemon.status(),
+            ("GET", "/ladder"): lambda q, body: daemon.ladder(q.get("underlying")),
+            ("GET", "/orders"): lambda q, body: daemon.orders.snapshot(),
+            ("GET", "/positions"): lambda q, body: daemon.positions.summary(),
+            ("GET", "/events"): lambda q, body: daemon.events_since(int(q.get("since", 0))),
+            ("POST", "/order"): lambda q, body: daemon.manual_order(**body),
+            ("POST", "/auto_trade"): lambda q, body: {"auto_trade": daemon.set_auto_trade(body["enabled"])},
+            ("POST", "/expiry"): lambda q, body: daemon.set_expiry(body["expiry"], body.get("underlying")),
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, code, payload):
+                data = json.dumps(payload, default=str).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _handle(self, method):
+                if token and self.headers.get("Authorization") != f"Bearer {token}":
+                    return self._reply(401, {"error": "unauthorized"})
+                url = urlparse(self.path)
+                route = routes.get((method, url.path.rstrip("/")))
+                if route is None:
+                    return self._reply(404, {"error": f"no route {method} {url.path}"})
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    body = json.loads(self.rfile.read(length)) if length else {}
+                    return self._reply(200, route(query, body))
+                except (ValueError, KeyError, TypeError) as e:
+                    return self._reply(400, {"error": str(e)})
+                except Exception as e:
+                    return self._reply(500, {"error": repr(e)})
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True, name="control-api").start()
+        self.log(f"Control API on http://{host}:{self.server.server_address[1]}")
+
+
+class DaemonClient:
+    """What the TUI uses to drive a running daemon."""
+    def __init__(self, url=f"http://127.0.0.1:{DAEMON_PORT}", token=None, timeout=5.0):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def _call(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(f"{self.url}{path}", data=data, method=method)
+        request.add_header("Content-Type", "application/json")
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(json.loads(e.read() or b"{}").get("error") or str(e)) from None
+
+    def status(self):
+        return self._call("GET", "/status")
+
+    def ladder(self, underlying=None):
+        return self._call("GET", "/ladder" + (f"?underlying={underlying}" if underlying else ""))
+
+    def orders(self):
+        return self._call("GET", "/orders")
+
+    def positions(self):
+        return self._call("GET", "/positions")
+
+    def events(self, since=0):
+        return self._call("GET", f"/events?since={since}")
+
+    def order(self, side, strike=None, legs="both", underlying=None, quantity=None):
+        body = {"side": side, "strike": strike, "legs": legs, "underlying": underlying, "quantity": quantity}
+        return self._call("POST", "/order", {k: v for k, v in body.items() if v is not None})
+
+    def auto_trade(self, enabled):
+        return self._call("POST", "/auto_trade", {"enabled": enabled})["auto_trade"]
+
+    def expiry(self, expiry, underlying=None):
+        return self._call("POST", "/expiry", {"expiry": expiry, "underlying": underlying})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", required=True)
+    parser.add_argument("--port", type=int, help="overrides api.port")
+    parser.add_argument("--live", action="store_true", help="place real orders (dry_run false)")
+    args = parser.parse_args()
+    config = load_config(args.config)
+    if args.port:
+        config["api"]["port"] = args.port
+    if args.live:
+        config["dry_run"] = False
+    TradingDaemon(config).run_forever()
+
+
+if __name__ == "__main__":
+    main()
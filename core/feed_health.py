@@ -0,0 +1,74 @@
+import threading
+import time
+
+
+class FeedHealth:
+    """
+    Connection history of the market data feed, for post-mortems: every
+    disconnect becomes a gap with its length and an estimate of the ticks
+    missed, from the tick rate seen while the feed was up.
+    """
+    def __init__(self, stale_after=5.0, rate_window=30.0):
+        self.stale_after = stale_after
+        self.rate_window = rate_window
+        self.lock = threading.Lock()
+        self.connected = False
+        self.connected_at = None
+        self.disconnected_at = None
+        self.connects = 0
+        self.disconnects = 0
+        self.total_down = 0.0
+        self.gaps = []
+        self.tick_rate = 0.0
+        self._window_start = time.monotonic()
+        self._window_ticks = 0
+
+    def on_connect(self):
+        now = time.monotonic()
+        with self.lock:
+            self.connected = True
+            self.connected_at = now
+            self.connects += 1
+            if self.disconnected_at is not None:
+                down = now - self.disconnected_at
+                self.total_down += down
+                self.gaps.append({
+                    "start": time.time() - down,
+                    "seconds": down,
+                    "missed_ticks_est": int(self.tick_rate * down),
+                })
+                self.disconnected_at = None
+            self._window_start, self._window_ticks = now, 0
+
+    def on_disconnect(self):
+        with self.lock:
+            if self.connected:
+                self.connected = False
+                self.disconnects += 1
+                self.disconnected_at = time.monotonic()
+
+    def on_tick(self):
+        self._window_ticks += 1
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= self.rate_window:
+            self.tick_rate = self._window_ticks / elapsed
+            self._window_start, self._window_ticks = now, 0
+
+    def down_for(self):
+        with self.lock:
+            if self.disconnected_at is None:
+                return 0.0
+            return time.monotonic() - self.disconnected_at
+
+    def summary(self):
+        with self.lock:
+            return {
+                "connected": self.connected,
+                "connects": self.connects,
+                "disconnects": self.disconnects,
+                "seconds_disconnected": self.total_down,
+                "missed_ticks_est": sum(g["missed_ticks_est"] for g in self.gaps),
+                "tick_rate": self.tick_rate,
+                "gaps": list(self.gaps),
+            }
@@ -0,0 +1,174 @@
+"""
+Latency histograms for the trade path, tick to child acknowledgement.
+
+    from core.metrics import METRICS
+    t0 = time.perf_counter()
+    ...
+    METRICS.since("master_place_order", t0)
+
+Samples land in HDR-style log-linear buckets (about 3% precision from 1 us
+to hours), so recording is an index computation and a counter bump, and
+p50/p99 come from the counts without keeping samples. METRICS.serve()
+exposes every stage as JSON on a local port, start_dump() logs them
+periodically.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+# 2**SUB_BITS linear buckets per power of two
+SUB_BITS = 6
+HALF = 1 << (SUB_BITS - 1)
+MAX_SHIFT = 40
+METRICS_PORT = 9100
+
+
+def bucket_of(us):
+    if us < (1 << SUB_BITS):
+        return max(us, 0)
+    shift = min(us.bit_length() - SUB_BITS, MAX_SHIFT)
+    return shift * HALF + min(us >> shift, (1 << SUB_BITS) - 1)
+
+
+def bucket_value(idx):
+    """Upper bound in us of what bucket idx holds."""
+    if idx < (1 << SUB_BITS):
+        return idx
+    shift = (idx >> (SUB_BITS - 1)) - 1
+    return ((idx - shift * HALF + 1) << shift) - 1
+
+
+class Histogram:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = [0] * ((MAX_SHIFT + 2) * HALF)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, seconds):
+        us = int(seconds * 1e6)
+        idx = bucket_of(us)
+        with self.lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.total += us
+            if us > self.max:
+                self.max = us
+
+    def percentile(self, q):
+        """Value in us at quantile q (0..1), None before any sample."""
+        with self.lock:
+            if not self.count:
+                return None
+            rank = max(1, int(q * self.count + 0.5))
+            seen = 0
+            for idx, n in enumerate(self.counts):
+                seen += n
+                if seen >= rank:
+                    return min(bucket_value(idx), self.max)
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count / 1000,
+            "p50_ms": self.percentile(0.50) / 1000,
+            "p99_ms": self.percentile(0.99) / 1000,
+            "max_ms": self.max / 1000,
+        }
+
+    def reset(self):
+        with self.lock:
+            self.counts = [0] * len(self.counts)
+            self.count = self.total = self.max = 0
+
+
+class Metrics:
+    """One Histogram per stage name, created on first use."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.server = None
+        self.dump_stop = None
+
+    def stage(self, name):
+        hist = self.stages.get(name)
+        if hist is None:
+            with self.lock:
+                hist = self.stages.setdefault(name, Histogram())
+        return hist
+
+    def record(self, name, seconds):
+        self.stage(name).record(seconds)
+
+    def since(self, name, start):
+        """Records perf_counter() - start under name and returns it."""
+        elapsed = time.perf_counter() - start
+        self.stage(name).record(elapsed)
+        return elapsed
+
+    def snapshot(self):
+        return {name: hist.summary() for name, hist in sorted(self.stages.items())}
+
+    def reset(self):
+        for hist in list(self.stages.values()):
+            hist.reset()
+
+    def format(self):
+        lines = []
+        for name, s in self.snapshot().items():
+            if s["count"]:
+                lines.append(f"{name}: n={s['count']} p50 {s['p50_ms']:.3f} ms "
+                             f"p99 {s['p99_ms']:.3f} ms max {s['max_ms']:.3f} ms")
+        return "\n".join(lines)
+
+    def serve(self, port=METRICS_PORT, host="127.0.0.1"):
+        """GET /metrics on a daemon thread; returns the bound port."""
+        if self.server is not None:
+            return self.server.server_address[1]
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = json.dumps(metrics.snapshot()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server.server_address[1]
+
+    def start_dump(self, log, interval=60.0):
+        """Calls log(text) with every stage's percentiles each interval seconds."""
+        self.dump_stop = threading.Event()
+
+        def run(stop):
+            while not stop.wait(interval):
+                text = self.format()
+                if text:
+                    log(text)
+        threading.Thread(target=run, args=(self.dump_stop,), daemon=True).start()
+
+    def stop(self):
+        if self.dump_stop:
+            self.dump_stop.set()
+        if self.server:
+            self.server.shutdown()
+            self.server = None
+
+
+METRICS = Metrics()
@@ -0,0 +1,293 @@
+"""
+Optional multi-process deployment: the feed, the strategy and the order
+fan-out each run in their own interpreter, so none of them waits on
+another's GIL.
+
+    python -m core.multiproc --master home/accounts/m.env --child home/accounts/c1.env
+    python main.py --observe --master home/accounts/m.env
+
+    feed       SmartWebSocketV2 -> SharedTickStore, plus one (token, time)
+               record per tick on the `ticks` queue
+    strategy   ATM tracking, ladder and entry rule on the shared store;
+               subscription changes go back to the feed on `subs`, trade
+               signals to the execution process on `signals`
+    execution  Replicator over the master and child accounts
+
+The launcher logs every account in once; the processes reuse the saved
+sessions. Every process builds its chains from the same day's instrument
+cache, which is what lines up the shared slots, so this mode is restarted
+daily instead of using the in-process rollover. A full ticks queue only
+drops the notification: the price is already in the shared store.
+A second launcher for the same client refuses to start while the first
+one's blocks exist; --force takes over blocks left by a crashed session.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import struct
+import threading
+import time
+
+from logzero import logger
+
+from core.options_main import OptionTrader, VIX_TOKEN
+from core.shm import SharedTickStore, SpscQueue
+
+# token, monotonic ns at receipt
+TICK = struct.Struct("<qq")
+QUEUES = {
+    "ticks": {"capacity": 1 << 16, "record_size": 32},
+    "subs": {"capacity": 256, "record_size": 16384},
+    "signals": {"capacity": 256, "record_size": 4096},
+}
+
+
+def block_names(client):
+    return {"store": f"algo_{client}_store", **{q: f"algo_{client}_{q}" for q in QUEUES}}
+
+
+def attach_store(trader, blocks, create=False, writer=False, force=False):
+    """Replaces the trader's private TickStore with the shared one."""
+    extra = [u.index_token for u in trader.underlyings.values()] + [VIX_TOKEN]
+    trader.store = SharedTickStore([u.chain for u in trader.underlyings.values()], blocks["store"],
+                                   create=create, writer=writer, extra_tokens=extra, force=force)
+    return trader.store
+
+
+def load_trader(path, names, cls=OptionTrader, login=False, **kwargs):
+    trader = cls(path, **kwargs)
+    trader.underlying_names = list(names)
+    trader.on_status = logger.info
+    if login and not trader.restore_session():
+        trader.authenticate()
+    return trader
+
+
+class FeedTrader(OptionTrader):
+    """Websocket only; the strategy runs in another process."""
+    def __init__(self, client_path, ticks, subs):
+        super().__init__(client_path)
+        self.ticks = ticks
+        self.subs_queue = subs
+        self.remote = {}
+
+    def on_tick(self, token, recv_ts):
+        if token.isdigit():
+            self.ticks.put(TICK.pack(int(token), time.monotonic_ns()))
+
+    def apply_remote(self, command):
+        """A subscribe/unsubscribe frame from the strategy process."""
+        key = (command["mode"], command["exchange_type"])
+        tokens = self.remote.setdefault(key, set())
+        if command["op"] == "subscribe":
+            tokens.update(command["tokens"])
+        else:
+            tokens.difference_update(command["tokens"])
+        self.subs.set(f"strategy-{key[0]}-{key[1]}:range", sorted(tokens),
+                      mode=key[0], exchange_type=key[1])
+
+    def serve_subscriptions(self):
+        while not self.stop_event.is_set():
+            command = self.subs_queue.get_json(timeout=0.5)
+            if command is None:
+                continue
+            self.apply_remote(command)
+            # one flush for everything the strategy queued meanwhile
+            while (payload := self.subs_queue.get()) is not None:
+                self.apply_remote(json.loads(payload))
+            self.flush_subscriptions()
+
+
+class QueueFeed:
+    """
+    Stands in for the websocket in the strategy process; frames go to the
+    feed. A frame is never dropped: a full ring is waited on, and if the
+    feed doesn't drain it in `timeout` the send raises, which leaves the
+    SubscriptionManager dirty so the next flush resends the whole diff.
+    """
+    def __init__(self, queue, timeout=5.0):
+        self.queue = queue
+        self.timeout = timeout
+
+    def _send(self, op, mode, token_list):
+        for group in token_list:
+            frame = {"op": op, "mode": mode, "exchange_type": group["exchangeType"], "tokens": group["tokens"]}
+            if not self.queue.put_json(frame, timeout=self.timeout):
+                raise BufferError(f"{self.queue.name} full for {self.timeout}s, {op} frame not sent")
+
+    def subscribe(self, correlation_id, mode, token_list):
+        self._send("subscribe", mode, token_list)
+
+    def unsubscribe(self, correlation_id, mode, token_list):
+        self._send("unsubscribe", mode, token_list)
+
+    def close_connection(self):
+        pass
+
+
+def run_feed(master_path, names, blocks, stop):
+    ticks = SpscQueue(blocks["ticks"], **QUEUES["ticks"])
+    subs = SpscQueue(blocks["subs"], **QUEUES["subs"])
+    trader = load_trader(master_path, names, FeedTrader, login=True, ticks=ticks, subs=subs)
+    trader.loading_tokens()
+    attach_store(trader, blocks, writer=True)
+    threading.Thread(target=trader.serve_subscriptions, daemon=True).start()
+    threading.Thread(target=trader.start_connection, daemon=True).start()
+    stop.wait()
+    trader.stop()
+    logger.info(f"feed: {ticks.dropped} tick notifications dropped")
+
+
+def strip_credentials(signal):
+    legs = [{k: v for k, v in leg.items() if k not in ("API", "AUTH_TOKEN")} for leg in signal["legs"]]
+    return dict(signal, legs=legs)
+
+
+def run_strategy(master_path, names, blocks, stop, auto_trade=True):
+    ticks = SpscQueue(blocks["ticks"], **QUEUES["ticks"])
+    signals = SpscQueue(blocks["signals"], **QUEUES["signals"])
+    trader = load_trader(master_path, names)
+    trader.loading_tokens()
+    attach_store(trader, blocks)
+    trader.sws = QueueFeed(SpscQueue(blocks["subs"], **QUEUES["subs"]))
+    # the feed process owns the connection, staleness comes from the shared recv_ns
+    trader.health.on_connect()
+    trader.auto_trade_enabled = auto_trade
+
+    def send_signal(signal):
+        # a trade signal is never dropped silently either
+        if not signals.put_json(strip_credentials(signal), timeout=1.0):
+            logger.error(f"strategy: signals ring full, {signal.get('underlying')} trade not sent")
+
+    trader.on_trade_signal = send_signal
+    while not stop.is_set():
+        record = ticks.get_wait(timeout=0.5)
+        if record is None:
+            continue
+        token, received = TICK.unpack(record)
+        # perf_counter and monotonic_ns share CLOCK_MONOTONIC on Linux
+        recv_ts = time.perf_counter() - (time.monotonic_ns() - received) / 1e9
+        try:
+            trader.on_tick(str(token), recv_ts)
+        except Exception as e:
+            logger.error(f"strategy: {e!r}")
+        if trader.subs.dirty:
+            trader.flush_subscriptions()
+    logger.info(f"strategy latency: {trader.latency_stats()}")
+
+
+def run_execution(master_path, child_paths, names, blocks, stop):
+    from core.TradeReplicator import Replicator
+    from core.order_status import OrderStateTable, OrderStatusPoller
+    from core.order_stream import OrderStream
+
+    signals = SpscQueue(blocks["signals"], **QUEUES["signals"])
+    master = load_trader(master_path, names, login=True)
+    children = [load_trader(path, names, login=True) for path in child_paths]
+    orders = OrderStateTable()
+    orders.listeners.append(lambda orderid, state: logger.info(
+        f"{state.get('client')} {state.get('symbol')} {orderid}: {state.get('status')} {state.get('text')}"))
+    poller = OrderStatusPoller(orders)
+    poller.start()
+    master.order_tracker = poller
+    replicator = Replicator(master, children, logger=logger.info)
+    replicator.orders = orders
+    # the poller only knows the master; child orders are confirmed here
+    stream = OrderStream(orders, on_status=logger.info)
+    for t in [master, *children]:
+        t.open_order_stream(stream)
+    replicator.warm_up()
+    while not stop.is_set():
+        signal = signals.get_json(timeout=0.5)
+        if signal is not None:
+            replicator.execute(signal)
+    poller.stop()
+    stream.stop()
+    replicator.close()
+
+
+class Observer:
+    """Read-only view of a running session for the TUI; `names` must match the launcher's."""
+    def __init__(self, master_path, names=("NIFTY",)):
+        self.trader = load_trader(master_path, names)
+        self.trader.on_status = None
+        self.trader.loading_tokens()
+        attach_store(self.trader, block_names(self.trader.CLIENT))
+
+    def ladder(self):
+        """(spot, atm, rows) of the primary underlying, rows as update_ladder() returns them."""
+        u = self.trader.underlying
+        spot = self.trader.store.get(u.index_token)
+        if spot is None:
+            return None, None, []
+        atm = u.get_atm_strike(spot)
+        if atm != u.current_atm:
+            u.update_atm(atm)
+        return spot, u.current_atm, u.update_ladder()
+
+    def close(self):
+        self.trader.store.close_block()
+
+
+def main():
+    from utils.auth_helper import authenticate_all_concurrent
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--master", required=True)
+    parser.add_argument("--child", action="append", default=[])
+    parser.add_argument("--underlying", action="append", help="repeatable, first is primary")
+    parser.add_argument("--no-auto-trade", action="store_true")
+    parser.add_argument("--force", action="store_true",
+                        help="take over shared memory left behind by a session that died")
+    args = parser.parse_args()
+    names = args.underlying or ["NIFTY"]
+
+    master = load_trader(args.master, names)
+    children = [load_trader(path, names) for path in args.child]
+    successes, failures = authenticate_all_concurrent(master, children, on_status=logger.info)
+    if master not in successes:
+        raise SystemExit(f"master login failed: {failures.get(master)!r}")
+    child_paths = [path for path, t in zip(args.child, children) if t in successes]
+
+    blocks = block_names(master.CLIENT)
+    store, queues = None, []
+    try:
+        store = attach_store(master, blocks, create=True, force=args.force)
+        for name in QUEUES:
+            queues.append(SpscQueue(blocks[name], create=True, force=args.force, **QUEUES[name]))
+    except FileExistsError as e:
+        for q in queues:
+            q.close()
+        if store is not None:
+            store.close_block()
+        raise SystemExit(f"{e}; is another launcher running for {master.CLIENT}?")
+
+    ctx = mp.get_context("spawn")
+    stop = ctx.Event()
+    # consumers first, so nothing the feed publishes is missed
+    procs = [
+        ctx.Process(target=run_execution, args=(args.master, child_paths, names, blocks, stop), name="execution"),
+        ctx.Process(target=run_strategy, args=(args.master, names, blocks, stop, not args.no_auto_trade), name="strategy"),
+        ctx.Process(target=run_feed, args=(args.master, names, blocks, stop), name="feed"),
+    ]
+    for p in procs:
+        p.start()
+    try:
+        while all(p.is_alive() for p in procs):
+            time.sleep(1)
+        logger.error(f"{[p.name for p in procs if not p.is_alive()]} exited, stopping")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for p in procs:
+            p.join(5)
+            if p.is_alive():
+                p.terminate()
+        for q in queues:
+            q.close()
+        store.close_block()
+
+
+if __name__ == "__main__":
+    main()
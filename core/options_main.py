@@ -3,9 +3,33 @@ from SmartApi import SmartConnect
 from SmartApi.smartWebSocketV2 import SmartWebSocketV2
 from dotenv import dotenv_values
 from logzero import logger, logfile
-from utils.load_instrument_token import load_options_token ,get_current_expiry
+from utils.load_instrument_token import load_options_frame, options_token_maps, get_current_expiry, cache_path
+from core.chain_index import ChainIndex
+from core.underlying import Underlying, UNDERLYINGS
+from core.tick_store import TickStore
+from core.subscriptions import SubscriptionManager
+from core.tick_log import TickRecorder, write_token_meta
+from core.feed_health import FeedHealth
+from core.metrics import METRICS
+from core.positions import PositionBook
+from collections import deque
+from datetime import date, datetime, timedelta, time as dtime
 import threading
-import json, pyotp, math, time, os
+import json, pyotp, math, time, os, random
+
+SPOT_TOKEN = "99926000"
+VIX_TOKEN = "99926017"
+# SmartWebSocketV2 allows this many token subscriptions per connection
+MAX_TOKENS_PER_CONNECTION = 1000
+# reconnect backoff, seconds
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+# a connection that lived this long resets the backoff
+RECONNECT_HEALTHY_AFTER = 60.0
+# the scrip master for the new day is reloaded at this local time,
+# retried every INSTRUMENT_RETRY seconds until it succeeds
+INSTRUMENT_REFRESH_AT = dtime(8, 45)
+INSTRUMENT_RETRY = 300
 
 
 class OptionTrader:
@@ -31,6 +55,8 @@ class OptionTrader:
         self.on_tokens_changed = None 
         self.on_trade_signal = None    
         self.on_tile = None
+        self.on_chains = None
+        self.on_mtm = None
 
         self.obj = SmartConnect(api_key=self.API, disable_ssl=True)
         
@@ -42,24 +68,40 @@ class OptionTrader:
         
         self.name = None
         
-        self.ce_token = None
-        self.pe_token = None
         self.preview_ce_token = None
         self.preview_pe_token = None
         
         self.tile_details = {}
-        self.ltp_cache = {}
-        self.current_atm = None
-        self.diff_threshold = 3
-        self.range_tokens = set()
-        self.ranged_strikes = []
-        
-        self.trade_taken = False
+        self.store = None
+        self.recorder = None
         self.auto_trade_enabled = True
+
+        # every underlying shares this websocket and tick store, the
+        # primary one feeds the UI ladder
+        self.underlying_names = ["NIFTY"]
+        self.underlyings = {}
+        self.underlying = None
+        self.index_owner = {}
+        self.subs = SubscriptionManager(limit=MAX_TOKENS_PER_CONNECTION)
+
+        # event driven mode: ticks mark strikes dirty and the signal/ladder
+        # run straight from on_data instead of the 0.5s polling loop
+        self.event_driven = True
+        self.tick_lock = threading.RLock()
+        self.signal_latency = deque(maxlen=1000)
+        self.ladder_latency = deque(maxlen=1000)
+
+        # reconnects and staleness; prices older than stale_after seconds
+        # are not traded on
+        self.health = FeedHealth(stale_after=5.0)
+        # wall clock for recv_ns and the stale check; a replay drives it
+        # from the recorded timestamps instead
+        self.clock_ns = time.time_ns
+        self.reconnect_base_delay = RECONNECT_BASE_DELAY
+        self.reconnect_max_delay = RECONNECT_MAX_DELAY
         
-        self.expiry = None 
-        self.expiry_list = None
-        self.symbol_token_map = None  
+        self.order_tracker = None
+        self.positions = None
         
         
         
@@ -113,6 +155,13 @@ class OptionTrader:
             except Exception:
                 pass
             
+    def _emit_chains(self):
+        if callable(self.on_chains):
+            try:
+                self.on_chains(list(self.expiry_list or []))
+            except Exception:
+                pass
+
     def _emit_tile(self, token: str,ltp :float, previous_close: float):
         if callable(self.on_tile):
             try:
@@ -121,12 +170,146 @@ class OptionTrader:
                 pass
             
             
-    def loading_tokens(self):
+    def loading_tokens(self, names=None):
         self._emit_status("Downloading Tokens")
-        self.expiry_list , self.symbol_token_map = load_options_token()
-        self.expiry = self.expiry_list[0]
-        # self._emit_status(f"Tokens Loaded and current expiry {self.expiry}")
-        
+        names = names or self.underlying_names
+        built = {}
+        for name in names:
+            df = load_options_frame(name)
+            expiry_list, symbol_token_map = options_token_maps(df)
+            chain = ChainIndex.from_frame(df, expiry_list)
+            lot = int(df['lotsize'].iloc[0]) if len(df) else 0
+            built[name] = (chain, expiry_list, symbol_token_map, lot)
+        self.set_chains(built)
+
+    def set_chains(self, built):
+        """
+        built: name -> (chain, expiry_list, symbol_token_map, lot), first one
+        is primary. The underlyings and store are built aside and swapped in
+        together, so a reader sees the old set or the new one, never a mix.
+        On a refresh the expiry, ATM, settings and last prices carry over.
+        """
+        underlyings = {name: Underlying(self, name, *spec, **UNDERLYINGS[name])
+                       for name, spec in built.items()}
+        store = TickStore([u.chain for u in underlyings.values()])
+        old = self.underlyings
+        for name, u in underlyings.items():
+            prev = old.get(name)
+            if prev is not None:
+                u.diff_threshold, u.range_count = prev.diff_threshold, prev.range_count
+                if prev.expiry in u.chain.expiry_pos:
+                    u.expiry = prev.expiry
+
+        # on_data writes the store under tick_lock, so no tick lands in the
+        # old store between the export and the swap
+        with self.tick_lock:
+            if self.store is not None:
+                store.merge(self.store.export())
+            self.underlyings = underlyings
+            self.underlying = next(iter(underlyings.values()))
+            self.index_owner = {u.index_token: u for u in underlyings.values()}
+            self.store = store
+            if self.positions is not None:
+                self.positions.bind(store)
+            for name in old:
+                if name not in underlyings:
+                    for consumer in ("atm", "range", "prewarm"):
+                        self.subs.clear(f"{name}:{consumer}")
+            for name, u in underlyings.items():
+                prev = old.get(name)
+                if prev is not None and prev.current_atm is not None:
+                    u.update_atm(prev.current_atm)
+        if old:
+            self.flush_subscriptions()
+            self._emit_chains()
+
+    def refresh_instruments(self):
+        """Reloads today's scrip master off the feed thread and swaps the chains in."""
+        self.loading_tokens(list(self.underlyings) or None)
+        self._emit_status(f"Instruments refreshed, nearest expiry {self.expiry}")
+
+    def start_rollover(self, at=INSTRUMENT_REFRESH_AT):
+        """Runs refresh_instruments() every day at `at` (local time) until stop()."""
+        def run():
+            while not self.stop_event.is_set():
+                now = datetime.now()
+                due = datetime.combine(now.date(), at)
+                if due <= now:
+                    due += timedelta(days=1)
+                if self.stop_event.wait((due - now).total_seconds()):
+                    return
+                while not self.stop_event.is_set():
+                    try:
+                        self.refresh_instruments()
+                        break
+                    except Exception as e:
+                        self._emit_status(f"instrument refresh failed, retrying: {e!r}")
+                        self.stop_event.wait(INSTRUMENT_RETRY)
+        threading.Thread(target=run, daemon=True, name="instrument-rollover").start()
+
+    # --- the primary underlying, what the UI reads and writes ---
+    @property
+    def chain(self):
+        return self.underlying.chain if self.underlying else None
+
+    @property
+    def expiry_list(self):
+        return self.underlying.expiry_list if self.underlying else None
+
+    @property
+    def symbol_token_map(self):
+        return self.underlying.symbol_token_map if self.underlying else None
+
+    @property
+    def expiry(self):
+        return self.underlying.expiry if self.underlying else None
+
+    @expiry.setter
+    def expiry(self, value):
+        self.underlying.expiry = value
+
+    def set_expiry(self, expiry):
+        with self.tick_lock:
+            rows = self.underlying.set_expiry(expiry)
+        self.flush_subscriptions()
+        return rows
+
+    @property
+    def expiry_idx(self):
+        return self.underlying.expiry_idx
+
+    @property
+    def current_atm(self):
+        return self.underlying.current_atm if self.underlying else None
+
+    @property
+    def ce_token(self):
+        return self.underlying.ce_token if self.underlying else None
+
+    @property
+    def pe_token(self):
+        return self.underlying.pe_token if self.underlying else None
+
+    @property
+    def ranged_strikes(self):
+        return self.underlying.ranged_strikes
+
+    @property
+    def diff_threshold(self):
+        return self.underlying.diff_threshold
+
+    @diff_threshold.setter
+    def diff_threshold(self, value):
+        for u in self.underlyings.values():
+            u.diff_threshold = value
+
+    @property
+    def trade_taken(self):
+        return self.underlying.trade_taken
+
+    @trade_taken.setter
+    def trade_taken(self, value):
+        self.underlying.trade_taken = value
 
     # --- business logic unchanged, but calls UI hooks ---
     def authenticate(self):
@@ -138,10 +321,13 @@ class OptionTrader:
         self.name = data['name']
         self._emit_status(f"Login successful for {self.name}")
 
-        with open(f"{self.CLIENT}_session.json", 'w') as f:
-            json.dump(session['data'], f)
+        with open(self.session_path(), 'w') as f:
+            json.dump({**session['data'], "saved_on": date.today().isoformat()}, f)
             self._emit_status("Session tokens saved")
 
+        self._emit_funds()
+
+    def _emit_funds(self):
         # funds
         try:
             funds = self.get_fund_details()
@@ -149,49 +335,194 @@ class OptionTrader:
         except Exception as e:
             self._emit_status(f"Failed to fetch funds: {e!r}")
 
+    def session_path(self):
+        return f"{self.CLIENT}_session.json"
+
+    def restore_session(self):
+        """
+        Reuse the tokens authenticate() saved earlier today. One getProfile
+        call checks the broker still accepts them; False means a full login
+        is needed.
+        """
+        try:
+            with open(self.session_path(), 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        # Angel One sessions end with the trading day
+        if data.get("saved_on") != date.today().isoformat() or not data.get('jwtToken'):
+            return False
+
+        jwt = data['jwtToken']
+        self.obj.setAccessToken(jwt.removeprefix("Bearer "))
+        self.obj.setRefreshToken(data.get('refreshToken'))
+        self.obj.setFeedToken(data.get('feedToken'))
+        self.obj.setUserId(self.CLIENT)
+        try:
+            profile = self.obj.getProfile(data.get('refreshToken'))
+        except Exception:
+            return False
+        if not profile or not profile.get('status'):
+            return False
+
+        self.AUTH_TOKEN = jwt
+        self.FEED_TOKEN = data['feedToken']
+        self.name = data.get('name') or profile['data'].get('name')
+        self._emit_status(f"Session restored for {self.name}")
+        self._emit_funds()
+        return True
+
+    def open_order_stream(self, stream):
+        """Push this account's order updates into a shared OrderStream."""
+        stream.add(self)
+        stream.start()
+
     def get_fund_details(self):
         rms = self.obj.rmsLimit()        
         return rms['data']['availablecash']
 
-    def get_atm_strike(self, price, step=50):
-        return math.ceil(price / step) * step
+    def get_atm_strike(self, price, step=None):
+        return math.ceil(price / (step or self.underlying.step)) * (step or self.underlying.step)
 
-    def get_strike_range(self,atm,count=5,step=50):
+    def get_strike_range(self,atm,count=5,step=None):
+        step = step or self.underlying.step
         return [atm + i * step for i in range(-count,count+1)]
 
     def get_ce_pe_tokens(self, strike):
-        ce = self.symbol_token_map[f"NIFTY{self.expiry}{strike}CE"]
-        pe = self.symbol_token_map[f"NIFTY{self.expiry}{strike}PE"]
-        return ce, pe
+        return self.underlying.get_ce_pe_tokens(strike)
+
+    def flush_subscriptions(self):
+        try:
+            self.subs.flush(self.sws)
+        except Exception as e:
+            self._emit_status(f"error while subscribing:{e}")
 
     def on_open(self, ws):
-        self._emit_status("WebSocket opened")
-        self.sws.subscribe(
-            correlation_id="NIFTY_SPOT_and_VIX",
-            mode=2,
-            token_list=[{"exchangeType": 1, "tokens": ["99926000","99926017"]}]  # NSE index token
-        )
+        self.health.on_connect()
+        gaps = self.health.gaps
+        if gaps and self.health.connects > 1:
+            gap = gaps[-1]
+            self._emit_status(f"WebSocket reconnected after {gap['seconds']:.1f}s "
+                              f"(~{gap['missed_ticks_est']} ticks missed), resubscribing")
+        else:
+            self._emit_status("WebSocket opened")
+        # a fresh connection has no subscriptions
+        self.subs.reset()
+        index_tokens = [*self.index_owner, VIX_TOKEN]
+        self.subs.set("index", index_tokens, mode=2, exchange_type=1)  # NSE index tokens
+        self.flush_subscriptions()
+
+    def start_recording(self, path):
+        self.recorder = TickRecorder(path)
+        if self.chain is not None:
+            u = self.underlying
+            write_token_meta(path, self.chain, u.index_token, name=u.name, lot=u.lot, expiry=u.expiry)
+        self._emit_status(f"Recording ticks to {path}")
+
+    def stop_recording(self):
+        recorder, self.recorder = self.recorder, None
+        if recorder:
+            recorder.close()
 
     def on_data(self, ws, message):
+        recv_ts = time.perf_counter()
+        recv_ns = self.clock_ns()
+        if self.recorder:
+            self.recorder.write(message, recv_ns)
         token = message.get('token')
+        closed_price = message.get('closed_price')
+        previous_close = closed_price / 100 if closed_price else None
         if token:
+            self.health.on_tick()
             ltp = message.get('last_traded_price') / 100
-            self.ltp_cache[token] = ltp
+            with self.tick_lock:
+                self.store.update(token, ltp,
+                                  exch_ts=message.get('exchange_timestamp'),
+                                  seq=message.get('sequence_number'),
+                                  recv_ns=recv_ns,
+                                  close=previous_close)
             self._emit_price(token, ltp)
         
-        closed_price = message.get('closed_price')
         if closed_price:
-            previous_close = closed_price / 100
             # self.tile_details[token] = previous_close
             self._emit_tile(token,ltp,previous_close)
-        
+
+        if token and self.event_driven:
+            try:
+                self.on_tick(token, recv_ts)
+            except Exception as e:
+                self._emit_status(f"error: {e!r}")
+            # whatever this tick changed goes out as one batched diff
+            if self.subs.dirty:
+                self.flush_subscriptions()
+        METRICS.since("on_data", recv_ts)
+
+    def on_tick(self, token, recv_ts):
+        """Runs on the websocket thread right after a tick lands in the store.
+        Only the underlying and strikes the tick touches are re-evaluated."""
+        with self.tick_lock:
+            u = self.index_owner.get(token)
+            if u is not None:
+                u.on_index_tick(self.store.get(token))
+            elif token.isdigit():
+                for u in self.underlyings.values():
+                    pos = u.chain.locate(token)
+                    if pos is not None:
+                        u.on_option_tick(pos[0], pos[1])
+                        break
+                else:
+                    u = None
+
+            if u is not None:
+                if token in (u.ce_token, u.pe_token, u.index_token):
+                    u.check_entry(recv_ts)
+                if u.dirty_strikes:
+                    u.update_ladder()
+                    self.ladder_latency.append(time.perf_counter() - recv_ts)
+            if token in (self.preview_ce_token, self.preview_pe_token):
+                self.update_preview()
+        if self.positions is not None and token in self.positions.watch:
+            self._emit_mtm()
 
     def on_error(self, ws, error):
         self._emit_status(f"WebSocket error: {error}")
 
     def on_close(self, ws):
+        self.health.on_disconnect()
         self._emit_status("WebSocket closed")
 
+    def track_positions(self, orders):
+        """
+        Builds a PositionBook off the OrderStateTable's fills (every account
+        whose orders land there) and keeps its open tokens subscribed; the
+        book is re-marked on each tick of one of them and on each fill.
+        """
+        book = PositionBook(self.store)
+
+        def on_change(tokens):
+            self.subs.set("positions", tokens, mode=1, exchange_type=2)
+            self.flush_subscriptions()
+            self._emit_mtm()
+
+        book.on_change = on_change
+        orders.listeners.append(book.on_order)
+        self.positions = book
+        return book
+
+    def _emit_mtm(self):
+        if callable(self.on_mtm):
+            try:
+                _, per_account, _ = self.positions.mtm()
+                self.on_mtm(dict(zip(self.positions.clients, per_account.tolist())))
+            except Exception as e:
+                self._emit_status(f"MTM update failed: {e!r}")
+
+    def is_stale(self, tokens):
+        """True if the feed is down or any of the tokens hasn't ticked within stale_after."""
+        if not self.health.connected or self.store is None:
+            return True
+        return bool(self.store.stale_mask(tokens, self.health.stale_after, now_ns=self.clock_ns()).any())
+
     def create_websocket(self):
         self.sws = SmartWebSocketV2(self.AUTH_TOKEN, self.API, self.CLIENT, self.FEED_TOKEN, max_retry_attempt=0)
         self.sws.on_open = self.on_open
@@ -201,28 +532,14 @@ class OptionTrader:
 
     def emit_trade_signal(self, trade_signal):
         if hasattr(self, "on_trade_signal") and callable(self.on_trade_signal):
+            start = time.perf_counter()
             self.on_trade_signal(trade_signal)
+            METRICS.since("emit_trade_signal", start)
         else:
             self._emit_status("No trade signal handler attached")
 
-    def build_trade_signal(self,tokens:list,B_S: str, quantity= 65):
-        legs = []
-        if len(tokens) == 0:
-            tokens = [self.ce_token,self.pe_token]
-        for i in tokens:
-            leg_dict = {}
-            leg_dict['AUTH_TOKEN'] = self.AUTH_TOKEN
-            leg_dict['API'] = self.API
-            leg_dict["symbol"] = self.symbol_token_map.inv[str(i)]
-            leg_dict["token"] = i
-            leg_dict["B_S"] = B_S
-            leg_dict["quantity"] = f"{quantity}"
-            legs.append(leg_dict)
-        
-        return {
-            "startergy": "ATM_DIFF_SELL",
-            "legs" : legs
-        }
+    def build_trade_signal(self,tokens:list,B_S: str, quantity=None):
+        return self.underlying.build_trade_signal(tokens, B_S, quantity)
 
     def preview(self,spot :str):
         self.spot = spot
@@ -232,129 +549,132 @@ class OptionTrader:
             if not self.preview_ce_token or not self.preview_pe_token:
                 self._emit_status("Preview tokens not found for that spot.")
                 return
-            self.sws.subscribe(
-                correlation_id="preview",
-                mode=1,
-                token_list=[{"exchangeType":2,"tokens":[self.preview_ce_token,self.preview_pe_token]}]
-            )
+            # replaces the previous preview pair, which drops out of the feed
+            self.subs.set("preview", [self.preview_ce_token,self.preview_pe_token],
+                          mode=1, exchange_type=self.underlying.exchange_type)
+            self.flush_subscriptions()
             self._emit_status("Preview added")
         except:
             self._emit_status("Something went wrong in preview")
         
     def get_other_spots(self,strike):
-        other_spot_tokens = {}
-        temp = strike - 250
-        count = 1
-        for i in range(10):
-            if temp != strike:
-                other_spot_tokens[(f"row{count}",temp)] = (self.get_ce_pe_tokens(temp))
-                count+=1
-            temp+=50
-        return other_spot_tokens
+        return self.underlying.get_other_spots(strike)
 
-            
     def subscribe_strike_range(self,atm):
-        strikes = self.get_strike_range(atm)
-        new_tokens = []
-        
-        for strike in strikes:
-            ce,pe = self.get_ce_pe_tokens(strike)
-            if ce and pe:
-                new_tokens.extend([ce,pe])
-        new_tokens = set(new_tokens)
-        remove_tokens = list(self.range_tokens - new_tokens)
-        
-        if remove_tokens:
-            self.sws.unsubscribe(
-                correlation_id  = "REM_RANGE",
-                mode = 1,
-                token_list=[{"exchangeType": 2, "tokens": remove_tokens}]
-            )
-        add_tokens = list(new_tokens-self.range_tokens)
-        
-        if add_tokens:
-            self.sws.subscribe(
-                correlation_id  = "ADD_RANGE",
-                mode = 1,
-                token_list=[{"exchangeType": 2, "tokens": add_tokens}]
-            )
-        self.range_tokens = new_tokens
-        self.ranged_strikes = strikes
-        
+        with self.tick_lock:
+            self.underlying.subscribe_strike_range(atm)
+        self.flush_subscriptions()
+
+    def update_atm(self, atm):
+        self.underlying.update_atm(atm)
+
+    def check_entry(self, tick_ts=None):
+        self.underlying.check_entry(tick_ts)
+
+    def ladder(self):
+        return self.underlying.ladder()
+
+    def update_ladder(self):
+        return self.underlying.update_ladder()
+
+    def update_preview(self):
+        preview_ce_value, preview_pe_value = self.store.prices([self.preview_ce_token, self.preview_pe_token])
+        if preview_ce_value is not None and preview_pe_value is not None:
+            
+            preview_diff = abs(preview_ce_value - preview_pe_value)
+            
+            self._emit_preview(self.spot,preview_ce_value,preview_pe_value,preview_diff)
+
+    def latency_stats(self):
+        """p50/p99/max in ms for tick->signal and tick->ladder."""
+        stats = {}
+        for name, samples in (("signal", self.signal_latency), ("ladder", self.ladder_latency)):
+            values = sorted(samples)
+            if not values:
+                stats[name] = None
+                continue
+            pick = lambda q: values[min(len(values) - 1, int(q * len(values)))] * 1000
+            stats[name] = {"count": len(values), "p50": pick(0.50), "p99": pick(0.99), "max": values[-1] * 1000}
+        return stats
+
     def main(self):
-        # Runs in a background thread
+        # Polling mode, runs in a background thread when event_driven is off
         while not self.stop_event.is_set():
-            if "99926000" in self.ltp_cache:
-                self.nifty_price = self.ltp_cache["99926000"]
-                atm = self.get_atm_strike(self.nifty_price)
-                other_spot_tokens = self.get_other_spots(atm)
-                tokens = [item for sublist in other_spot_tokens.values() for item in sublist]
-                if atm != self.current_atm:
-                    old_ce, old_pe = self.ce_token, self.pe_token
-                    self.ce_token, self.pe_token = self.get_ce_pe_tokens(atm)
-                    if self.ce_token and self.pe_token:
-                        # Unsubscribe old
-                        if old_ce and old_pe:
-                            self.sws.unsubscribe(
-                                correlation_id="REMOVE_OPT",
-                                mode=1,
-                                token_list=[{"exchangeType": 2, "tokens": [old_ce, old_pe]}]
-                            )
-                        # Subscribe new
-                        try:
-                            self.sws.subscribe(
-                                correlation_id="ADD_OPT",
-                                mode=1,
-                                token_list=[{"exchangeType": 2, "tokens": [self.ce_token, self.pe_token , *tokens]}]
-                            )
-                            self.current_atm = atm
-                            self._emit_tokens_changed(atm, self.ce_token, self.pe_token)
-                            self.subscribe_strike_range(atm)
-                        except Exception as e:
-                            self._emit_status(f"error while subscribing:{e}")
             try:
-            # CE & PE values if available
-                if self.ce_token in self.ltp_cache and self.pe_token in self.ltp_cache:
-                    ce_value = self.ltp_cache[self.ce_token]
-                    pe_value = self.ltp_cache[self.pe_token]
-                    diff = abs(ce_value - pe_value)
-                
-                    if diff <= self.diff_threshold and self.auto_trade_enabled and not self.trade_taken:
-                        self._emit_status("Entry condition met")
-                        signal = self.build_trade_signal([],"SELL")
-                        self.emit_trade_signal(signal)
-                        self.trade_taken = True
-                        
-                row = []
-                for strike in self.ranged_strikes:
-                    ce,pe = self.get_ce_pe_tokens(strike)
-                    ce_ltp = self.ltp_cache.get(ce)
-                    pe_ltp = self.ltp_cache.get(pe)
-                    if ce_ltp is not None and pe_ltp is not None:
-                        diff = abs(ce_ltp-pe_ltp)
-                        row.append((strike,ce_ltp,pe_ltp,diff))
-                if row:
-                    self._emit_table(row)
-
-                if self.preview_ce_token in self.ltp_cache and self.preview_pe_token in self.ltp_cache:
-                    preview_ce_value = self.ltp_cache[self.preview_ce_token]
-                    preview_pe_value = self.ltp_cache[self.preview_pe_token]
-                    
-                    preview_diff = abs(preview_ce_value - preview_pe_value)
-                    
-                    self._emit_preview(self.spot,preview_ce_value,preview_pe_value,preview_diff)
+                with self.tick_lock:
+                    for u in self.underlyings.values():
+                        price = self.store.get(u.index_token)
+                        if price is not None:
+                            u.on_index_tick(price)
+                        u.check_entry()
+                        u.update_ladder()
+                    self.update_preview()
+                self.flush_subscriptions()
             except Exception as e:
-                self._emit_status("error: ",e)
+                self._emit_status(f"error: {e!r}")
             time.sleep(0.5)
 
 
     def start_connection(self):
-        self.create_websocket()
-        threading.Thread(target=self.main, daemon=True).start()
-        self.sws.connect()
+        """
+        Runs the feed until stop(). connect() blocks for the life of one
+        connection; when it drops, a new websocket is built after an
+        exponential backoff and on_open resubscribes everything the
+        subscription manager still wants.
+        """
+        if not self.event_driven:
+            threading.Thread(target=self.main, daemon=True).start()
+        attempt = 0
+        while not self.stop_event.is_set():
+            self.create_websocket()
+            started = time.monotonic()
+            try:
+                self.sws.connect()
+            except Exception as e:
+                self._emit_status(f"WebSocket error: {e}")
+            self.health.on_disconnect()
+            if self.stop_event.is_set():
+                break
+            if time.monotonic() - started > RECONNECT_HEALTHY_AFTER:
+                attempt = 0
+            delay = min(self.reconnect_max_delay, self.reconnect_base_delay * 2 ** attempt)
+            delay += random.uniform(0, delay / 2)
+            attempt += 1
+            self._emit_status(f"WebSocket down, reconnecting in {delay:.1f}s (attempt {attempt})")
+            self.stop_event.wait(delay)
+        logger.info(f"feed health: {json.dumps(self.health.summary())}")
+
+    def snapshot_path(self):
+        # lives in today's instrument cache dir, so it goes when that does
+        return os.path.join(cache_path(), "last_prices.npz")
+
+    def save_snapshot(self):
+        """Last prices of every expiry, so a restart today starts with a filled ladder."""
+        if self.store is None:
+            return
+        path = self.snapshot_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.store.save(path)
+
+    def restore_snapshot(self):
+        path = self.snapshot_path()
+        if self.store is None or not os.path.exists(path):
+            return 0
+        try:
+            count = self.store.restore(path)
+        except Exception as e:
+            self._emit_status(f"price snapshot not restored: {e!r}")
+            return 0
+        self._emit_status(f"Restored {count} last prices from {path}")
+        return count
 
     def stop(self):
         self.stop_event.set()
+        self.stop_recording()
+        try:
+            self.save_snapshot()
+        except Exception as e:
+            logger.error(f"price snapshot not saved: {e!r}")
         try:
             if self.sws:
                 self.sws.close_connection()
@@ -375,11 +695,19 @@ class OptionTrader:
                 "price": "0",
                 "quantity": quantity
             }
+            start = time.perf_counter()
             orderid = self.obj.placeOrder(orderparams)
+            METRICS.since("master_place_order", start)
+            if not orderid:
+                # nothing to confirm, a tracked None would stay pending for good
+                logger.error(f"Order placement failed for {self.CLIENT}: {symbol} {B_S} {quantity}, no order id")
+                self._emit_status(f"Order placement failed: {symbol} {B_S}, no order id")
+                return None
             logger.info(f"Order placed successfully for {self.CLIENT}, Order ID: {orderid}")
-            book = self.obj.orderBook()
-            order_response = book['data'][0]['text']
-            logger.info(f"{self.CLIENT}: {order_response}")
-            self._emit_status(f"Order placed: {orderid} | {order_response}")
+            self._emit_status(f"Order placed: {orderid}")
+            # status arrives later through the tracker, not on this path
+            if self.order_tracker is not None:
+                self.order_tracker.track(self, orderid, symbol=symbol, token=token, B_S=B_S, quantity=quantity)
+            return orderid
         except Exception as e:
             self._emit_status(f"Order placement failed: {e}")
@@ -0,0 +1,126 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+FINAL_STATES = {"complete", "rejected", "cancelled"}
+
+
+class OrderStateTable:
+    """
+    In-memory status of every order placed from this process, keyed by
+    orderid. Fed by whatever confirms orders (poller, order websocket);
+    listeners get (orderid, state) on every change.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.orders = {}
+        self.listeners = []
+
+    def placed(self, client, orderid, symbol=None, token=None, B_S=None, quantity=None):
+        state = {
+            "client": client, "orderid": orderid, "symbol": symbol, "token": token,
+            "B_S": B_S, "quantity": quantity, "status": "placed", "text": "",
+            "average_price": 0.0, "filled": 0, "placed_at": time.time(), "updated_at": time.time(),
+        }
+        with self.lock:
+            self.orders[orderid] = state
+        self._notify(orderid, dict(state))
+
+    def update(self, orderid, **fields):
+        with self.lock:
+            state = self.orders.setdefault(orderid, {"orderid": orderid, "status": "unknown"})
+            changed = any(state.get(k) != v for k, v in fields.items())
+            state.update(fields, updated_at=time.time())
+            state = dict(state)
+        if changed:
+            self._notify(orderid, state)
+        return state
+
+    def _notify(self, orderid, state):
+        for listener in list(self.listeners):
+            try:
+                listener(orderid, state)
+            except Exception:
+                pass
+
+    def get(self, orderid):
+        with self.lock:
+            state = self.orders.get(orderid)
+            return dict(state) if state else None
+
+    def pending(self):
+        with self.lock:
+            return [dict(s) for s in self.orders.values() if s.get("status") not in FINAL_STATES]
+
+    def snapshot(self):
+        with self.lock:
+            return {k: dict(v) for k, v in self.orders.items()}
+
+
+def order_fields(order):
+    """Normalise an orderBook / order-update entry to the table's fields."""
+    return {
+        "status": (order.get("orderstatus") or order.get("status") or "").lower(),
+        "text": order.get("text") or "",
+        "average_price": float(order.get("averageprice") or 0),
+        "filled": int(float(order.get("filledshares") or 0)),
+    }
+
+
+class OrderStatusPoller:
+    """
+    Confirms orders off the placement path. Pending orders are grouped by
+    account and each account's order book is fetched once per round,
+    accounts in parallel, however many orders it has in flight.
+    """
+    def __init__(self, table, interval=1.0, max_workers=8):
+        self.table = table
+        self.interval = interval
+        self.traders = {}
+        self.wake = threading.Event()
+        self.stop_event = threading.Event()
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="order-status")
+        self.thread = None
+
+    def track(self, trader, orderid, **leg):
+        self.traders[trader.CLIENT] = trader
+        self.table.placed(trader.CLIENT, orderid, **leg)
+        self.wake.set()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake.set()
+        self.pool.shutdown(wait=False)
+
+    def _poll_account(self, client, orderids):
+        trader = self.traders[client]
+        book = trader.obj.orderBook()
+        for order in (book or {}).get("data") or []:
+            if order.get("orderid") in orderids:
+                self.table.update(order["orderid"], **order_fields(order))
+
+    def poll_once(self):
+        by_client = {}
+        for state in self.table.pending():
+            if state.get("client") in self.traders:
+                by_client.setdefault(state["client"], set()).add(state["orderid"])
+        futures = [self.pool.submit(self._poll_account, c, ids) for c, ids in by_client.items()]
+        for f in futures:
+            try:
+                f.result()
+            except Exception:
+                pass
+        return bool(by_client)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.wake.wait()
+            self.wake.clear()
+            # keep polling while anything is in flight, then sleep until track()
+            while not self.stop_event.is_set() and self.poll_once():
+                self.stop_event.wait(self.interval)
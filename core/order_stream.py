@@ -0,0 +1,172 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import select
+import threading
+import time
+import websocket
+
+from core.order_status import order_fields
+
+ORDER_UPDATE_URL = "wss://tns.angelone.in/smart-order-update"
+HEARTBEAT_MESSAGE = "ping"
+# a partial frame only holds the select thread this long; websocket-client
+# keeps the bytes read so far and the next recv() carries on
+RECV_TIMEOUT = 0.2
+
+
+class OrderStream:
+    """
+    Angel One order-update websockets for every account, serviced by one
+    thread with select() instead of a thread per connection. Every update
+    (fills, rejections, average price) lands in the shared OrderStateTable.
+    Connects and reconnects run on a small pool so a slow handshake never
+    holds up the other accounts' updates.
+    """
+    def __init__(self, table, heartbeat=10.0, reconnect_delay=5.0, on_status=None):
+        self.table = table
+        self.heartbeat = heartbeat
+        self.reconnect_delay = reconnect_delay
+        self.on_status = on_status
+        self.accounts = {}
+        self.conns = {}
+        self.retry_at = {}
+        self.connecting = set()
+        self.connector = ThreadPoolExecutor(max_workers=4, thread_name_prefix="order-stream-connect")
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def _status(self, msg):
+        if callable(self.on_status):
+            try:
+                self.on_status(msg)
+            except Exception:
+                pass
+
+    def add(self, trader):
+        with self.lock:
+            self.accounts[trader.CLIENT] = trader
+            self.retry_at[trader.CLIENT] = 0.0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.connector.shutdown(wait=False)
+        with self.lock:
+            conns = list(self.conns.values())
+            self.conns.clear()
+        for ws in conns:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def _connect(self, trader):
+        jwt = (trader.AUTH_TOKEN or "").removeprefix("Bearer ")
+        ws = websocket.create_connection(ORDER_UPDATE_URL, timeout=10, header=[
+            f"Authorization: Bearer {jwt}",
+            f"x-api-key: {trader.API}",
+            f"x-client-code: {trader.CLIENT}",
+            f"x-feed-token: {trader.FEED_TOKEN}",
+        ])
+        self._status(f"Order stream open for {trader.CLIENT}")
+        return ws
+
+    def _open(self, client, trader):
+        """Runs on the connector pool; hands the socket to the select thread when it is up."""
+        try:
+            ws = self._connect(trader)
+            ws.settimeout(RECV_TIMEOUT)
+        except Exception as e:
+            with self.lock:
+                self.connecting.discard(client)
+            self._drop(client, e)
+            return
+        with self.lock:
+            self.connecting.discard(client)
+            if not self.stop_event.is_set():
+                self.conns[client] = ws
+                return
+        ws.close()
+
+    def _drop(self, client, error):
+        with self.lock:
+            ws = self.conns.pop(client, None)
+            self.retry_at[client] = time.monotonic() + self.reconnect_delay
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        self._status(f"Order stream lost for {client}: {error!r}")
+
+    def handle(self, client, raw):
+        if not raw or raw == "pong":
+            return
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            return
+        order = data.get("orderData") or {}
+        orderid = order.get("orderid")
+        if orderid:
+            self.table.update(orderid, client=client, symbol=order.get("tradingsymbol"),
+                              token=order.get("symboltoken"), B_S=order.get("transactiontype"),
+                              **order_fields(order))
+
+    def _read(self, client, ws):
+        """Every complete frame on this connection, including ones already decrypted into the SSL buffer."""
+        while True:
+            try:
+                self.handle(client, ws.recv())
+            except websocket.WebSocketTimeoutException:
+                return
+            except Exception as e:
+                self._drop(client, e)
+                return
+            pending = getattr(ws.sock, "pending", None)
+            if not (pending and pending()):
+                return
+
+    def _run(self):
+        last_ping = time.monotonic()
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            with self.lock:
+                waiting = [(c, t) for c, t in self.accounts.items()
+                           if c not in self.conns and c not in self.connecting
+                           and self.retry_at.get(c, 0) <= now]
+                self.connecting.update(c for c, _ in waiting)
+                conns = dict(self.conns)
+            for client, trader in waiting:
+                self.connector.submit(self._open, client, trader)
+
+            socks = {ws.sock: client for client, ws in conns.items() if ws.sock}
+            if not socks:
+                self.stop_event.wait(0.2)
+                continue
+            # TLS records already decrypted into the SSL buffer don't make
+            # the raw socket readable, select() would sit on them
+            readable = [sock for sock in socks if getattr(sock, "pending", None) and sock.pending()]
+            if not readable:
+                try:
+                    readable, _, _ = select.select(list(socks), [], [], 1.0)
+                except (OSError, ValueError):
+                    readable = []
+            for sock in readable:
+                client = socks[sock]
+                self._read(client, conns[client])
+
+            if time.monotonic() - last_ping >= self.heartbeat:
+                last_ping = time.monotonic()
+                for client, ws in conns.items():
+                    if client not in self.conns:
+                        continue
+                    try:
+                        ws.send(HEARTBEAT_MESSAGE)
+                    except Exception as e:
+                        self._drop(client, e)
@@ -0,0 +1,177 @@
+import threading
+import numpy as np
+
+
+class PositionBook:
+    """
+    Net position of every account in every traded token, built from the
+    fills the OrderStateTable reports (poller or order websocket), marked to
+    market from the TickStore.
+
+    One row per (account, token) in flat numpy arrays, so MTM for every
+    account and leg is a gather of the rows' store slots plus a few vector
+    ops and a bincount, however many accounts are attached; no position()
+    calls to the broker.
+    """
+    def __init__(self, store=None, capacity=256):
+        self.lock = threading.Lock()
+        self.store = store
+        self.rows = {}
+        self.clients = []
+        self.client_idx = {}
+        self.row_token = []
+        self.row_symbol = []
+        self.applied = {}
+        # called with the open tokens after every fill
+        self.on_change = None
+
+        self.account = np.zeros(capacity, dtype=np.int32)
+        self.slot = np.full(capacity, -1, dtype=np.int64)
+        self.buy_qty = np.zeros(capacity, dtype=np.int64)
+        self.sell_qty = np.zeros(capacity, dtype=np.int64)
+        self.buy_value = np.zeros(capacity)
+        self.sell_value = np.zeros(capacity)
+        self.watch = set()
+
+    def __len__(self):
+        return len(self.row_token)
+
+    def _grow(self):
+        for name in ("account", "slot", "buy_qty", "sell_qty", "buy_value", "sell_value"):
+            old = getattr(self, name)
+            new = np.full(len(old) * 2, -1 if name == "slot" else 0, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _row(self, client, token, symbol):
+        row = self.rows.get((client, token))
+        if row is not None:
+            return row
+        row = len(self.row_token)
+        if row == len(self.account):
+            self._grow()
+        if client not in self.client_idx:
+            self.client_idx[client] = len(self.clients)
+            self.clients.append(client)
+        self.account[row] = self.client_idx[client]
+        slot = self.store.slot_of(token, create=True) if self.store is not None else None
+        self.slot[row] = -1 if slot is None else slot
+        self.rows[(client, token)] = row
+        self.row_token.append(token)
+        self.row_symbol.append(symbol)
+        self.watch.add(token)
+        return row
+
+    def bind(self, store):
+        """Point every row at a (new) store, after an instrument refresh."""
+        with self.lock:
+            self.store = store
+            for row, token in enumerate(self.row_token):
+                slot = store.slot_of(token, create=True)
+                self.slot[row] = -1 if slot is None else slot
+
+    # --- fills ---
+    def _apply(self, client, token, B_S, quantity, price, symbol):
+        row = self._row(client, str(token), symbol)
+        if str(B_S).upper() == "BUY":
+            self.buy_qty[row] += quantity
+            self.buy_value[row] += quantity * price
+        else:
+            self.sell_qty[row] += quantity
+            self.sell_value[row] += quantity * price
+
+    def _changed(self):
+        if callable(self.on_change):
+            self.on_change(self.open_tokens())
+
+    def fill(self, client, token, B_S, quantity, price, symbol=None):
+        """Applies one fill of `quantity` at `price`."""
+        with self.lock:
+            self._apply(client, token, B_S, quantity, price, symbol)
+        self._changed()
+
+    def on_order(self, orderid, state):
+        """
+        OrderStateTable listener: applies whatever was filled since the last
+        update. Poller and order stream may both report the same fill, only
+        the increase in filled quantity counts.
+        """
+        client, token, side = state.get("client"), state.get("token"), state.get("B_S")
+        filled = int(state.get("filled") or 0)
+        if not (client and token and side) or filled <= 0:
+            return
+        value = filled * float(state.get("average_price") or 0)
+        with self.lock:
+            prev_filled, prev_value = self.applied.get(orderid, (0, 0.0))
+            if filled <= prev_filled:
+                return
+            self.applied[orderid] = (filled, value)
+            delta = filled - prev_filled
+            self._apply(client, token, side, delta, (value - prev_value) / delta, state.get("symbol"))
+        self._changed()
+
+    # --- marking ---
+    def open_tokens(self):
+        """Tokens with a non-zero net quantity in any account."""
+        with self.lock:
+            n = len(self.row_token)
+            open_rows = np.flatnonzero(self.buy_qty[:n] != self.sell_qty[:n])
+            return sorted({self.row_token[i] for i in open_rows})
+
+    def _copy(self, labels=False):
+        """
+        The book's rows, copied under the lock so a concurrent fill can't
+        tear them; tokens and symbols only when asked, the tick path skips them.
+        """
+        with self.lock:
+            n = len(self.row_token)
+            rows = {
+                "slot": self.slot[:n].copy(), "account": self.account[:n].copy(),
+                "buy_qty": self.buy_qty[:n].copy(), "sell_qty": self.sell_qty[:n].copy(),
+                "buy_value": self.buy_value[:n].copy(), "sell_value": self.sell_value[:n].copy(),
+                "clients": list(self.clients),
+            }
+            if labels:
+                rows["token"], rows["symbol"] = list(self.row_token), list(self.row_symbol)
+            return rows
+
+    def _mark(self, rows):
+        slots = rows["slot"]
+        net = rows["buy_qty"] - rows["sell_qty"]
+        cash = rows["sell_value"] - rows["buy_value"]
+        store = self.store
+        if store is not None and len(slots):
+            ltp = store._read(lambda: store.ltp[np.maximum(slots, 0)].copy())
+            ltp[slots < 0] = np.nan
+        else:
+            ltp = np.full(len(slots), np.nan)
+        unpriced = (net != 0) & np.isnan(ltp)
+        per_row = cash + np.where(net != 0, net * np.nan_to_num(ltp), 0.0)
+        per_account = np.bincount(rows["account"], weights=per_row, minlength=len(rows["clients"]))
+        return per_row, per_account, unpriced
+
+    def mtm(self):
+        """
+        (per_row, per_account, unpriced): realised plus open quantity at the
+        store's last price. Open rows the store has no price for count as 0
+        and are flagged in `unpriced`.
+        """
+        return self._mark(self._copy())
+
+    def summary(self):
+        """client -> {"mtm", "positions": [...]}, for the UI and the control API."""
+        rows = self._copy(labels=True)
+        per_row, per_account, unpriced = self._mark(rows)
+        buy_qty, sell_qty = rows["buy_qty"], rows["sell_qty"]
+        buy_value, sell_value = rows["buy_value"], rows["sell_value"]
+        clients = rows["clients"]
+        out = {c: {"mtm": float(per_account[i]), "positions": []} for i, c in enumerate(clients)}
+        for row, token in enumerate(rows["token"]):
+            out[clients[rows["account"][row]]]["positions"].append({
+                "token": token, "symbol": rows["symbol"][row], "net_qty": int(buy_qty[row] - sell_qty[row]),
+                "buy_qty": int(buy_qty[row]), "sell_qty": int(sell_qty[row]),
+                "buy_avg": float(buy_value[row] / buy_qty[row]) if buy_qty[row] else 0.0,
+                "sell_avg": float(sell_value[row] / sell_qty[row]) if sell_qty[row] else 0.0,
+                "mtm": float(per_row[row]), "priced": not bool(unpriced[row]),
+            })
+        return out
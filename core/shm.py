@@ -0,0 +1,212 @@
+"""
+Shared-memory building blocks for the multi-process mode (core.multiproc).
+
+SharedTickStore is a TickStore whose arrays and seqlock counter live in a
+multiprocessing.shared_memory block: the feed process writes, any number
+of processes read with the same retry-on-version-change protocol.
+SpscQueue is a single-producer single-consumer ring of fixed-size records
+in shared memory; each side only ever moves its own index, so neither
+needs a lock.
+"""
+from multiprocessing import resource_tracker, shared_memory
+import json
+import struct
+import sys
+import threading
+import time
+import numpy as np
+
+from core.tick_store import TickStore
+
+# index words sit on their own cache lines
+_HEAD, _TAIL, _HEADER = 0, 64, 128
+_LEN = struct.Struct("<I")
+_attach_lock = threading.Lock()
+
+
+def _open_block(name, size, create, force=False):
+    """
+    create fails if a block of that name exists, which is another running
+    session for the same client; `force` unlinks it first, for a block left
+    behind by a session that died without cleaning up.
+    """
+    if create:
+        if force:
+            try:
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+        try:
+            return shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            raise FileExistsError(f"shared memory block {name} is in use by another session "
+                                  f"(pass force to take over a stale one)") from None
+    return _attach(name)
+
+
+def _attach(name):
+    """
+    Opens an existing block without tying its lifetime to this process.
+    Python registers every attach with the process's resource tracker,
+    which unlinks the block when the process exits; an observer or worker
+    closing would take the running session's store and rings with it.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # no track flag before 3.13. Registering and then unregistering is not
+    # enough: spawned workers share the launcher's tracker, and their
+    # unregister would drop the owner's entry too
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedTickStore(TickStore):
+    """
+    Every process must build it from the same chains (same day's cache)
+    and the same `extra_tokens`, so slots line up; tokens outside both
+    get private slots in the writer only. `create` allocates (and later
+    unlinks) the block, `force` replaces a stale one, only a `writer` may
+    update it.
+    """
+    def __init__(self, chains, name, create=False, writer=False, extra_tokens=(), history=64, extra=64,
+                 force=False):
+        self.name = name
+        self.owner = create
+        self.writer = writer
+        if not isinstance(chains, (list, tuple)):
+            chains = [chains]
+        size = sum(c.tokens.size for c in chains) + extra
+        nbytes = 8 + 6 * size * 8 + 2 * size * history * 8
+        self.shm = _open_block(name, nbytes, create, force)
+        self._offset = 8
+        self._versions = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=0)
+        if create:
+            self._versions[0] = 0
+        super().__init__(chains, history=history, extra=extra)
+        for token in extra_tokens:
+            TickStore.slot_of(self, token, create=True)
+
+    def _alloc(self, shape, dtype, fill):
+        array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=self._offset)
+        self._offset += array.nbytes
+        if self.owner:
+            array.fill(fill)
+        return array
+
+    def slot_of(self, token, create=False):
+        return super().slot_of(token, create=create and self.writer)
+
+    def _bump_version(self):
+        self._versions[0] += 1
+
+    def _load_version(self):
+        return int(self._versions[0])
+
+    def update(self, token, ltp, exch_ts=0, seq=0, recv_ns=0, close=None):
+        if not self.writer:
+            raise PermissionError("only the feed process writes the shared tick store")
+        return super().update(token, ltp, exch_ts=exch_ts, seq=seq, recv_ns=recv_ns, close=close)
+
+    def close_block(self):
+        # views into the block have to go before it can be closed
+        for field in ("ltp", "close", "exch_ts", "seq", "recv_ns", "ring_price", "ring_ts", "ring_count"):
+            setattr(self, field, None)
+        self._versions = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SpscQueue:
+    """Ring of `capacity` records of at most `record_size` bytes; put() returns False when full."""
+    def __init__(self, name, capacity=65536, record_size=256, create=False, force=False):
+        self.name = name
+        self.capacity = capacity
+        self.record_size = record_size
+        self.owner = create
+        self.shm = _open_block(name, _HEADER + capacity * record_size, create, force)
+        self.head = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=_HEAD)
+        self.tail = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=_TAIL)
+        if create:
+            self.head[0] = self.tail[0] = 0
+        self.data = self.shm.buf[_HEADER:]
+        self.dropped = 0
+
+    def put(self, payload):
+        if not self._put(payload):
+            self.dropped += 1
+            return False
+        return True
+
+    def _put(self, payload):
+        if len(payload) > self.record_size - _LEN.size:
+            raise ValueError(f"{len(payload)} byte record does not fit {self.name}")
+        tail = int(self.tail[0])
+        if tail - int(self.head[0]) >= self.capacity:
+            return False
+        offset = (tail % self.capacity) * self.record_size
+        _LEN.pack_into(self.data, offset, len(payload))
+        self.data[offset + _LEN.size:offset + _LEN.size + len(payload)] = payload
+        # publish only after the record is written
+        self.tail[0] = tail + 1
+        return True
+
+    def put_wait(self, payload, timeout=None):
+        """put() that waits for the consumer to make room; False only after `timeout`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._put(payload):
+            if deadline is not None and time.monotonic() > deadline:
+                self.dropped += 1
+                return False
+            time.sleep(0.001)
+        return True
+
+    def get(self):
+        head = int(self.head[0])
+        if head == int(self.tail[0]):
+            return None
+        offset = (head % self.capacity) * self.record_size
+        (length,) = _LEN.unpack_from(self.data, offset)
+        payload = bytes(self.data[offset + _LEN.size:offset + _LEN.size + length])
+        self.head[0] = head + 1
+        return payload
+
+    def get_wait(self, timeout=None, spin=1000):
+        """get(), spinning briefly and then sleeping 50us between polls."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        polls = 0
+        while True:
+            payload = self.get()
+            if payload is not None:
+                return payload
+            polls += 1
+            if polls > spin:
+                if deadline is not None and time.monotonic() > deadline:
+                    return None
+                time.sleep(0.00005)
+
+    def put_json(self, obj, timeout=0):
+        """timeout=0 drops the record when the ring is full, None waits for room."""
+        payload = json.dumps(obj, separators=(",", ":")).encode()
+        return self.put(payload) if timeout == 0 else self.put_wait(payload, timeout)
+
+    def get_json(self, timeout=None):
+        payload = self.get_wait(timeout)
+        return None if payload is None else json.loads(payload)
+
+    def __len__(self):
+        return int(self.tail[0]) - int(self.head[0])
+
+    def close(self):
+        self.head = self.tail = None
+        self.data.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,98 @@
+import threading
+
+# lower number wins when the connection's token limit is reached
+PRIORITY = {"index": 0, "atm": 1, "positions": 1, "range": 2, "preview": 3, "prewarm": 4}
+
+
+class SubscriptionManager:
+    """
+    Single owner of what the websocket is subscribed to.
+
+    Every consumer (index tiles, the ATM pair, the strike range, preview,
+    ...) declares its whole token set with set(); a token stays subscribed
+    while any consumer references it, at the highest mode any of them asked
+    for. Nothing is sent until flush(), which diffs the wanted set against
+    the live one and sends at most one subscribe and one unsubscribe per
+    (mode, exchangeType).
+    """
+    def __init__(self, limit=1000):
+        self.limit = limit
+        self.lock = threading.RLock()
+        self.wanted = {}
+        self.live = {}
+        self.dirty = False
+        self.stats = {"flushes": 0, "subscribe_frames": 0, "unsubscribe_frames": 0, "over_limit": 0}
+
+    def set(self, consumer, tokens, mode=1, exchange_type=2, priority=None):
+        if priority is None:
+            priority = PRIORITY.get(consumer.rsplit(":", 1)[-1], len(PRIORITY))
+        entry = {t: (mode, exchange_type, priority) for t in tokens if t}
+        with self.lock:
+            if self.wanted.get(consumer) != entry:
+                self.wanted[consumer] = entry
+                self.dirty = True
+
+    def clear(self, consumer):
+        with self.lock:
+            if self.wanted.pop(consumer, None):
+                self.dirty = True
+
+    def refcount(self, token):
+        with self.lock:
+            return sum(1 for entry in self.wanted.values() if token in entry)
+
+    def desired(self):
+        """token -> (mode, exchangeType) after merging consumers and applying the limit."""
+        merged = {}
+        for entry in self.wanted.values():
+            for token, (mode, exch, priority) in entry.items():
+                old = merged.get(token)
+                if old is None:
+                    merged[token] = (mode, exch, priority)
+                else:
+                    merged[token] = (max(mode, old[0]), exch, min(priority, old[2]))
+        if len(merged) > self.limit:
+            self.stats["over_limit"] += len(merged) - self.limit
+            keep = sorted(merged, key=lambda t: merged[t][2])[:self.limit]
+            merged = {t: merged[t] for t in keep}
+        return {t: (m, e) for t, (m, e, _) in merged.items()}
+
+    def diff(self):
+        desired = self.desired()
+        remove, add = {}, {}
+        for token, key in self.live.items():
+            if desired.get(token) != key:
+                remove.setdefault(key, []).append(token)
+        for token, key in desired.items():
+            if self.live.get(token) != key:
+                add.setdefault(key, []).append(token)
+        return desired, remove, add
+
+    def flush(self, sws):
+        """Send the pending diff; returns (subscribed, unsubscribed) token counts."""
+        with self.lock:
+            if not self.dirty or sws is None:
+                return 0, 0
+            desired, remove, add = self.diff()
+            for (mode, exch), tokens in remove.items():
+                sws.unsubscribe(correlation_id="SUBS_REM", mode=mode,
+                                token_list=[{"exchangeType": exch, "tokens": tokens}])
+                self.stats["unsubscribe_frames"] += 1
+            for (mode, exch), tokens in add.items():
+                sws.subscribe(correlation_id="SUBS_ADD", mode=mode,
+                              token_list=[{"exchangeType": exch, "tokens": tokens}])
+                self.stats["subscribe_frames"] += 1
+            self.live = desired
+            self.dirty = False
+            self.stats["flushes"] += 1
+            return sum(map(len, add.values())), sum(map(len, remove.values()))
+
+    def reset(self):
+        """The connection was replaced: nothing is live, everything wanted is pending."""
+        with self.lock:
+            self.live = {}
+            self.dirty = True
+
+    def tokens(self):
+        with self.lock:
+            return dict(self.live)
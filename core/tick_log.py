@@ -0,0 +1,279 @@
+"""
+Append-only binary log of SmartWebSocketV2 ticks and a replay driver.
+
+    python -m core.tick_log replay ticks.bin --account home/accounts/x.env --speed 10
+
+Every record is a fixed 58 byte struct, so a log can also be read straight
+into numpy with load_ticks(). The <log>.tokens.json sidecar written when
+recording starts holds the chain as it was then; a replay rebuilds its
+chain from it rather than from today's scrip master.
+"""
+from datetime import datetime
+import argparse
+import hashlib
+import json
+import struct
+import threading
+import time
+import numpy as np
+from bidict import bidict
+
+from core.chain_index import ChainIndex, CE
+
+SPOT_TOKEN = "99926000"
+MAGIC = b"TICKLOG1"
+RECORD = struct.Struct("<qBB16sqqqq")
+RECORD_DTYPE = np.dtype([
+    ("recv_ns", "<i8"),
+    ("subscription_mode", "u1"),
+    ("exchange_type", "u1"),
+    ("token", "S16"),
+    ("sequence_number", "<i8"),
+    ("exchange_timestamp", "<i8"),
+    ("last_traded_price", "<i8"),
+    ("closed_price", "<i8"),
+])
+
+
+class TickRecorder:
+    def __init__(self, path, flush_every=256):
+        self.path = path
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.flush_every = flush_every
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def write(self, message, recv_ns):
+        record = RECORD.pack(
+            recv_ns,
+            message.get("subscription_mode") or 0,
+            message.get("exchange_type") or 0,
+            str(message.get("token") or "").encode(),
+            message.get("sequence_number") or 0,
+            message.get("exchange_timestamp") or 0,
+            message.get("last_traded_price") or 0,
+            message.get("closed_price") or 0,
+        )
+        with self.lock:
+            self.file.write(record)
+            self.count += 1
+            if self.count % self.flush_every == 0:
+                self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def write_token_meta(path, chain, spot_token=SPOT_TOKEN, name=None, lot=None, expiry=None):
+    """
+    Sidecar next to a tick log so a backtest or a replay knows what every
+    token is: (expiry, strike, side) and symbol, plus the underlying, its
+    lot size and the expiry selected when recording started.
+    """
+    tokens, symbols = {}, {}
+    for e, s, side in zip(*np.nonzero(chain.tokens)):
+        token = str(chain.tokens[e, s, side])
+        tokens[token] = [chain.expiries[e], int(chain.strikes[s]), int(side)]
+        if chain.symbols[e, s, side] is not None:
+            symbols[token] = str(chain.symbols[e, s, side])
+    meta = {"spot": spot_token, "tokens": tokens, "symbols": symbols, "expiries": list(chain.expiries),
+            "name": name, "lot": int(lot) if lot else None, "expiry": expiry}
+    with open(f"{path}.tokens.json", "w") as file:
+        json.dump(meta, file)
+
+
+def read_token_meta(path):
+    with open(f"{path}.tokens.json") as file:
+        return json.load(file)
+
+
+def chain_from_meta(meta, name="NIFTY", lot=None):
+    """
+    (chain, expiry_list, symbol_token_map, lot) of a log's sidecar, the
+    shape OptionTrader.set_chains() takes. Sidecars written before symbols
+    were kept get them in the scrip master's NAME+EXPIRY+STRIKE+SIDE form.
+    """
+    tokens = meta["tokens"]
+    name = meta.get("name") or name
+    expiries = meta.get("expiries") or sorted({v[0] for v in tokens.values()},
+                                              key=lambda e: datetime.strptime(e, "%d%b%y"))
+    pos = {e: i for i, e in enumerate(expiries)}
+    strikes = np.array(sorted({int(v[1]) for v in tokens.values()}), dtype=np.int64)
+    grid = np.zeros((len(expiries), len(strikes), 2), dtype=np.int64)
+    symbols = np.full(grid.shape, None, dtype=object)
+    known = meta.get("symbols") or {}
+    for token, (expiry, strike, side) in tokens.items():
+        at = (pos[expiry], int(np.searchsorted(strikes, int(strike))), int(side))
+        grid[at] = int(token)
+        symbols[at] = known.get(token) or f"{name}{expiry}{int(strike)}{'CE' if side == CE else 'PE'}"
+    symbol_token_map = bidict({symbols[at]: str(grid[at]) for at in zip(*np.nonzero(grid))})
+    return ChainIndex(expiries, strikes, grid, symbols), expiries, symbol_token_map, int(meta.get("lot") or lot or 0)
+
+
+def _check_header(file, path):
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{path} is not a tick log")
+
+
+def read_ticks(path):
+    """Yields (recv_ns, message) with the message shaped like SmartWebSocketV2's."""
+    with open(path, "rb") as file:
+        _check_header(file, path)
+        while True:
+            chunk = file.read(RECORD.size)
+            if len(chunk) < RECORD.size:
+                return
+            recv_ns, mode, exch, token, seq, exch_ts, ltp, close = RECORD.unpack(chunk)
+            message = {
+                "subscription_mode": mode,
+                "exchange_type": exch,
+                "token": token.rstrip(b"\0").decode(),
+                "sequence_number": seq,
+                "exchange_timestamp": exch_ts,
+                "last_traded_price": ltp,
+            }
+            if close:
+                message["closed_price"] = close
+            yield recv_ns, message
+
+
+def load_ticks(path):
+    """Whole log as a numpy structured array."""
+    return np.fromfile(path, dtype=RECORD_DTYPE, offset=len(MAGIC))
+
+
+def replay(path, on_data, speed=1.0, clock=None):
+    """
+    Feeds a log into on_data(ws, message). speed=1 is real time, N is N
+    times faster, None or 0 is as fast as possible. A ReplayClock given as
+    `clock` is moved to each tick's recorded time before on_data sees it.
+    Returns (ticks, seconds).
+    """
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for recv_ns, message in read_ticks(path):
+        if speed:
+            if first is None:
+                first = recv_ns
+            due = start + (recv_ns - first) / 1e9 / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        if clock is not None:
+            clock.advance(recv_ns)
+        on_data(None, message)
+        count += 1
+    return count, time.perf_counter() - start
+
+
+class ReplayClock:
+    """Recorded receive time of the tick being replayed, as a time.time_ns stand-in."""
+    def __init__(self):
+        self.now_ns = 0
+
+    def advance(self, recv_ns):
+        self.now_ns = recv_ns
+
+    def __call__(self):
+        return self.now_ns
+
+
+class ReplayFeed:
+    """Stands in for SmartWebSocketV2 during a replay, remembers subscriptions."""
+    def __init__(self):
+        self.subscribed = set()
+
+    def subscribe(self, correlation_id, mode, token_list):
+        for group in token_list:
+            self.subscribed.update(group["tokens"])
+
+    def unsubscribe(self, correlation_id, mode, token_list):
+        for group in token_list:
+            self.subscribed.difference_update(group["tokens"])
+
+    def close_connection(self):
+        pass
+
+
+def replay_trader(trader, path, speed=None, tokens=None):
+    """
+    Replays a log through an OptionTrader that has loaded its tokens.
+    Returns the trade decisions it took, a digest of them and the tick rate,
+    so two code versions can be checked against the same session. With
+    `tokens`, ticks of any other token (other underlyings recorded in the
+    same log) are skipped.
+    """
+    decisions = []
+    ticks = [0]
+    on_data = trader.on_data
+
+    def counting(ws, message):
+        if tokens is not None and message["token"] not in tokens:
+            return
+        ticks[0] += 1
+        on_data(ws, message)
+
+    def on_signal(signal):
+        decisions.append({
+            "tick": ticks[0],
+            "legs": [(leg["symbol"], leg["B_S"], leg["quantity"]) for leg in signal["legs"]],
+        })
+
+    trader.sws = ReplayFeed()
+    # the log is the feed, so it counts as connected for the stale check,
+    # and staleness is judged on recorded time so replay speed can't
+    # change a decision
+    trader.health.on_connect()
+    trader.on_trade_signal = on_signal
+    live_clock, trader.clock_ns = trader.clock_ns, ReplayClock()
+    try:
+        count, seconds = replay(path, counting, speed, clock=trader.clock_ns)
+    finally:
+        trader.clock_ns = live_clock
+    digest = hashlib.sha256(json.dumps(decisions).encode()).hexdigest()
+    return {
+        "ticks": count,
+        "seconds": seconds,
+        "ticks_per_sec": count / seconds if seconds else float("inf"),
+        "decisions": decisions,
+        "digest": digest,
+        "latency": trader.latency_stats(),
+    }
+
+
+def main():
+    from core.options_main import OptionTrader
+
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    rp = sub.add_parser("replay")
+    rp.add_argument("log")
+    rp.add_argument("--account", required=True, help="env file used to build the OptionTrader")
+    rp.add_argument("--speed", type=float, default=0, help="1 = real time, 0 = as fast as possible")
+    rp.add_argument("--expiry", help="expiry code, defaults to the one selected while recording")
+    rp.add_argument("--underlying", default="NIFTY", help="for sidecars that don't name it")
+    rp.add_argument("--lot", type=int, help="for sidecars that don't record it")
+    args = parser.parse_args()
+
+    # the chain as it was when the log was recorded, not today's
+    meta = read_token_meta(args.log)
+    name = meta.get("name") or args.underlying
+    trader = OptionTrader(args.account)
+    trader.underlying_names = [name]
+    trader.set_chains({name: chain_from_meta(meta, name, args.lot)})
+    expiry = args.expiry or meta.get("expiry")
+    if expiry:
+        trader.expiry = expiry
+    known = set(meta["tokens"]) | {meta["spot"]}
+    result = replay_trader(trader, args.log, args.speed or None, tokens=known)
+    print(json.dumps({k: v for k, v in result.items() if k != "decisions"}, indent=2))
+    for d in result["decisions"]:
+        print(d)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import threading
+import time
+import numpy as np
+
+
+class TickStore:
+    """
+    Last price, exchange timestamp and sequence number for every option in
+    one or more ChainIndex (one per underlying), plus a small ring buffer of
+    recent ticks per token.
+
+    Each chain owns a block of slots laid out like the chain (expiry,
+    strike, side) so a ladder is one contiguous slice. Tokens outside the
+    chains (index spots, VIX) get slots after the last chain. There is one writer, the websocket thread; readers use
+    the version counter (seqlock) to retry instead of ever seeing a half
+    written tick.
+    """
+    def __init__(self, chains, history=64, extra=64):
+        if not isinstance(chains, (list, tuple)):
+            chains = [chains]
+        self.chains = list(chains)
+        self.bases = {}
+        base = 0
+        for chain in self.chains:
+            self.bases[id(chain)] = base
+            base += chain.tokens.size
+        self.chain_slots = base
+        self.size = self.chain_slots + extra
+        self.history = history
+        self.extra = {}
+
+        self.ltp = self._alloc(self.size, np.float64, np.nan)
+        self.close = self._alloc(self.size, np.float64, np.nan)
+        self.exch_ts = self._alloc(self.size, np.int64, 0)
+        self.seq = self._alloc(self.size, np.int64, 0)
+        self.recv_ns = self._alloc(self.size, np.int64, 0)
+
+        self.ring_price = self._alloc((self.size, history), np.float64, np.nan)
+        self.ring_ts = self._alloc((self.size, history), np.int64, 0)
+        self.ring_count = self._alloc(self.size, np.int64, 0)
+
+        self._version = 0
+        self._write_lock = threading.Lock()
+
+    def _alloc(self, shape, dtype, fill):
+        return np.full(shape, fill, dtype=dtype)
+
+    # the seqlock counter; odd while a write is in progress
+    def _bump_version(self):
+        self._version += 1
+
+    def _load_version(self):
+        return self._version
+
+    # --- slots ---
+    def chain_slot(self, chain, expiry_idx, strike_idx, side):
+        n_strikes = chain.tokens.shape[1]
+        return self.bases[id(chain)] + (expiry_idx * n_strikes + strike_idx) * 2 + side
+
+    def slot_of(self, token, create=False):
+        token = str(token)
+        slot = self.extra.get(token)
+        if slot is not None:
+            return slot
+        if token.isdigit():
+            for chain in self.chains:
+                pos = chain.locate(token)
+                if pos is not None:
+                    return self.chain_slot(chain, *pos)
+        if not create:
+            return None
+        if len(self.extra) >= self.size - self.chain_slots:
+            raise IndexError(f"tick store has no free slot for {token}")
+        slot = self.chain_slots + len(self.extra)
+        self.extra[token] = slot
+        return slot
+
+    # --- writer ---
+    def update(self, token, ltp, exch_ts=0, seq=0, recv_ns=0, close=None):
+        slot = self.slot_of(token, create=True)
+        with self._write_lock:
+            self._bump_version()
+            self.ltp[slot] = ltp
+            self.exch_ts[slot] = exch_ts or 0
+            self.seq[slot] = seq or 0
+            self.recv_ns[slot] = recv_ns
+            if close is not None:
+                self.close[slot] = close
+            n = self.ring_count[slot]
+            self.ring_price[slot, n % self.history] = ltp
+            self.ring_ts[slot, n % self.history] = exch_ts or recv_ns
+            self.ring_count[slot] = n + 1
+            self._bump_version()
+        return slot
+
+    # --- readers ---
+    def _read(self, fn):
+        while True:
+            version = self._load_version()
+            if version & 1:
+                time.sleep(0)
+                continue
+            result = fn()
+            if self._load_version() == version:
+                return result
+
+    def get(self, token):
+        slot = self.slot_of(token)
+        if slot is None:
+            return None
+        value = self.ltp[slot]
+        return None if np.isnan(value) else float(value)
+
+    def prices(self, tokens):
+        """Consistent prices for several tokens, None where not seen yet."""
+        slots = [self.slot_of(t) for t in tokens]
+        idx = np.array([-1 if s is None else s for s in slots])
+        values = self._read(lambda: self.ltp[idx].copy())
+        return [None if s is None or np.isnan(v) else float(v) for s, v in zip(slots, values)]
+
+    def snapshot(self, slots):
+        slots = np.asarray(slots)
+        return self._read(lambda: {
+            "ltp": self.ltp[slots].copy(),
+            "exch_ts": self.exch_ts[slots].copy(),
+            "seq": self.seq[slots].copy(),
+            "recv_ns": self.recv_ns[slots].copy(),
+        })
+
+    def ladder(self, chain, expiry_idx, lo, hi):
+        """CE and PE prices for strikes[lo:hi] of one expiry, one consistent read."""
+        start = self.chain_slot(chain, expiry_idx, lo, 0)
+        stop = self.chain_slot(chain, expiry_idx, hi, 0)
+        block = self._read(lambda: self.ltp[start:stop].copy()).reshape(-1, 2)
+        return block[:, 0], block[:, 1]
+
+    def export(self):
+        """Last price/close/timestamps of every token that has ticked, keyed by token."""
+        tokens, slots = [], []
+        for chain in self.chains:
+            e, s, side = np.nonzero(chain.tokens)
+            tokens.append(chain.tokens[e, s, side])
+            slots.append(self.chain_slot(chain, e, s, side))
+        extra = {t: slot for t, slot in self.extra.items() if t.isdigit()}
+        tokens.append(np.array([int(t) for t in extra], dtype=np.int64))
+        slots.append(np.array(list(extra.values()), dtype=np.int64))
+        tokens, slots = np.concatenate(tokens), np.concatenate(slots)
+        data = self.snapshot(slots)
+        seen = ~np.isnan(data["ltp"])
+        close = self._read(lambda: self.close[slots].copy())
+        return {"token": tokens[seen], "ltp": data["ltp"][seen], "close": close[seen],
+                "exch_ts": data["exch_ts"][seen], "seq": data["seq"][seen], "recv_ns": data["recv_ns"][seen]}
+
+    def merge(self, data):
+        """Takes prices from export() for tokens this store hasn't seen; they keep their recv_ns."""
+        count = 0
+        for token, ltp, close, exch_ts, seq, recv_ns in zip(
+                data["token"], data["ltp"], data["close"], data["exch_ts"], data["seq"], data["recv_ns"]):
+            token = str(token)
+            slot = self.slot_of(token)
+            if slot is not None and not np.isnan(self.ltp[slot]):
+                continue
+            self.update(token, float(ltp), int(exch_ts), int(seq), int(recv_ns),
+                        None if np.isnan(close) else float(close))
+            count += 1
+        return count
+
+    def save(self, path):
+        np.savez(path, **self.export())
+
+    def restore(self, path):
+        """Loads what save() wrote; old recv_ns means the prices read as stale."""
+        return self.merge(np.load(path))
+
+    def ladder_diff(self, chain, expiry_idx, lo, hi):
+        ce, pe = self.ladder(chain, expiry_idx, lo, hi)
+        return np.abs(ce - pe)
+
+    def age(self, tokens, now_ns=None):
+        """Seconds since each token last ticked, inf for never."""
+        now_ns = now_ns or time.time_ns()
+        slots = [self.slot_of(t) for t in tokens]
+        missing = np.array([s is None for s in slots])
+        idx = np.array([0 if s is None else s for s in slots])
+        recv = self._read(lambda: self.recv_ns[idx].copy())
+        ages = (now_ns - recv) / 1e9
+        ages[missing | (recv == 0)] = np.inf
+        return ages
+
+    def stale_mask(self, tokens, max_age, now_ns=None):
+        """True where a token's price is older than max_age seconds."""
+        return self.age(tokens, now_ns) > max_age
+
+    def recent(self, token):
+        """Ring buffer of the token's last ticks, oldest first: (prices, timestamps)."""
+        slot = self.slot_of(token)
+        if slot is None:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        def read():
+            n = int(self.ring_count[slot])
+            order = (np.arange(max(0, n - self.history), n)) % self.history
+            return self.ring_price[slot, order].copy(), self.ring_ts[slot, order].copy()
+        return self._read(read)
@@ -0,0 +1,194 @@
+import math
+import time
+import numpy as np
+from core.metrics import METRICS
+
+# index token (NSE, exchangeType 1), strike step and option exchangeType per underlying
+UNDERLYINGS = {
+    "NIFTY": {"index_token": "99926000", "step": 50, "exchange_type": 2},
+    "BANKNIFTY": {"index_token": "99926009", "step": 100, "exchange_type": 2},
+    "FINNIFTY": {"index_token": "99926037", "step": 50, "exchange_type": 2},
+    "MIDCPNIFTY": {"index_token": "99926074", "step": 25, "exchange_type": 2},
+}
+
+
+class Underlying:
+    """
+    Chain, ATM tracking, ladder and entry rule for one index. All of them
+    share the trader's websocket, tick store and hooks; only the trader's
+    primary underlying drives the UI ladder.
+    """
+    def __init__(self, trader, name, chain, expiry_list, symbol_token_map, lot,
+                 index_token, step, exchange_type=2, range_count=5):
+        self.trader = trader
+        self.name = name
+        self.chain = chain
+        self.expiry_list = expiry_list
+        self.symbol_token_map = symbol_token_map
+        self.lot = lot
+        self.index_token = index_token
+        self.step = step
+        self.exchange_type = exchange_type
+        self.range_count = range_count
+
+        self.expiry = expiry_list[0] if expiry_list else None
+        self.current_atm = None
+        self.ce_token = None
+        self.pe_token = None
+        self.range_tokens = set()
+        self.ranged_strikes = []
+        self.range_slice = (0, 0)
+        self.dirty_strikes = set()
+        self.diff_threshold = 3
+        self.trade_taken = False
+
+    @property
+    def is_primary(self):
+        return self.trader.underlying is self
+
+    @property
+    def expiry_idx(self):
+        return self.chain.expiry_pos[self.expiry]
+
+    def get_atm_strike(self, price):
+        return math.ceil(price / self.step) * self.step
+
+    def get_ce_pe_tokens(self, strike):
+        return self.chain.ce_pe(self.expiry_idx, int(strike))
+
+    def get_other_spots(self,strike):
+        other_spot_tokens = {}
+        # range_count steps below, one fewer above, as the fixed 10 row preview had
+        lo, hi = self.chain.window(strike, self.range_count, self.step, above=self.range_count - 1)
+        strikes = self.chain.strikes[lo:hi]
+        pairs = self.chain.token_str[self.expiry_idx, lo:hi]
+        count = 1
+        for temp, (ce, pe) in zip(strikes, pairs):
+            if temp != strike:
+                other_spot_tokens[(f"row{count}",int(temp))] = (ce, pe)
+                count+=1
+        return other_spot_tokens
+
+    def subscribe_strike_range(self,atm):
+        lo, hi = self.chain.window(atm, self.range_count, self.step)
+        strikes = [int(s) for s in self.chain.strikes[lo:hi]]
+        pairs = self.chain.token_str[self.expiry_idx, lo:hi]
+        new_tokens = []
+
+        for strike, (ce, pe) in zip(strikes, pairs):
+            if ce and pe:
+                new_tokens.extend([ce,pe])
+        # the manager works out what actually has to be (un)subscribed
+        self.trader.subs.set(f"{self.name}:range", new_tokens, mode=1, exchange_type=self.exchange_type)
+        # same strikes in the neighbouring expiries, so switching to one
+        # finds its prices already in the store
+        prewarm = []
+        for e in self.adjacent_expiries():
+            for ce, pe in self.chain.token_str[e, lo:hi]:
+                if ce and pe:
+                    prewarm.extend([ce, pe])
+        self.trader.subs.set(f"{self.name}:prewarm", prewarm, mode=1, exchange_type=self.exchange_type)
+        self.range_tokens = set(new_tokens)
+        self.ranged_strikes = strikes
+        self.range_slice = (lo, hi)
+        # expiry or range changed, every row has to be rebuilt
+        self.dirty_strikes = set(strikes)
+
+    def adjacent_expiries(self):
+        idx = self.expiry_idx
+        return [e for e in (idx - 1, idx + 1) if 0 <= e < len(self.chain.expiries)]
+
+    def set_expiry(self, expiry):
+        """Switch expiry and redraw the ladder straight from the store's last prices."""
+        self.expiry = expiry
+        atm = self.current_atm
+        if atm is not None:
+            ce, pe = self.get_ce_pe_tokens(atm)
+            if ce and pe:
+                self.update_atm(atm)
+            else:
+                self.subscribe_strike_range(atm)
+        return self.update_ladder(always=True)
+
+    def update_atm(self, atm):
+        trader = self.trader
+        ce, pe = self.get_ce_pe_tokens(atm)
+        if ce and pe:
+            self.ce_token, self.pe_token = ce, pe
+            trader.subs.set(f"{self.name}:atm", [ce, pe], mode=1, exchange_type=self.exchange_type)
+            self.current_atm = atm
+            if self.is_primary:
+                trader._emit_tokens_changed(atm, self.ce_token, self.pe_token)
+            self.subscribe_strike_range(atm)
+
+    def on_index_tick(self, price):
+        atm = self.get_atm_strike(price)
+        if atm != self.current_atm:
+            self.update_atm(atm)
+
+    def on_option_tick(self, expiry_idx, strike_idx):
+        lo, hi = self.range_slice
+        if expiry_idx == self.expiry_idx and lo <= strike_idx < hi:
+            self.dirty_strikes.add(int(self.chain.strikes[strike_idx]))
+
+    def check_entry(self, tick_ts=None):
+        trader = self.trader
+        # never trade on prices from before a disconnect or a frozen token
+        if trader.is_stale([self.index_token, self.ce_token, self.pe_token]):
+            return
+        # CE & PE values if available
+        ce_value, pe_value = trader.store.prices([self.ce_token, self.pe_token])
+        if ce_value is not None and pe_value is not None:
+            diff = abs(ce_value - pe_value)
+
+            if diff <= self.diff_threshold and trader.auto_trade_enabled and not self.trade_taken:
+                signal = self.build_trade_signal([],"SELL")
+                if tick_ts is not None:
+                    latency = time.perf_counter() - tick_ts
+                    trader.signal_latency.append(latency)
+                    METRICS.record("tick_to_signal", latency)
+                    trader._emit_status(f"{self.name} entry condition met ({latency*1000:.3f} ms after tick)")
+                else:
+                    trader._emit_status(f"{self.name} entry condition met")
+                trader.emit_trade_signal(signal)
+                self.trade_taken = True
+
+    def ladder(self):
+        """(strikes, ce, pe, diff) arrays for the ranged strikes, one snapshot."""
+        lo, hi = self.range_slice
+        ce, pe = self.trader.store.ladder(self.chain, self.expiry_idx, lo, hi)
+        return self.chain.strikes[lo:hi], ce, pe, np.abs(ce - pe)
+
+    def update_ladder(self, always=False):
+        """always: emit even an empty ladder, so rows of a previous expiry are cleared."""
+        self.dirty_strikes = set()
+        strikes, ce, pe, diff = self.ladder()
+        seen = ~np.isnan(diff)
+        row = [(int(k), float(c), float(p), float(d))
+               for k, c, p, d in zip(strikes[seen], ce[seen], pe[seen], diff[seen])]
+        if (row or always) and self.is_primary:
+            self.trader._emit_table(row)
+        return row
+
+    def build_trade_signal(self,tokens:list,B_S: str, quantity=None):
+        trader = self.trader
+        legs = []
+        if len(tokens) == 0:
+            tokens = [self.ce_token,self.pe_token]
+        for i in tokens:
+            leg_dict = {}
+            leg_dict['AUTH_TOKEN'] = trader.AUTH_TOKEN
+            leg_dict['API'] = trader.API
+            leg_dict["symbol"] = self.chain.symbol_of(i)
+            leg_dict["token"] = i
+            leg_dict["B_S"] = B_S
+            leg_dict["quantity"] = f"{quantity or self.lot}"
+            legs.append(leg_dict)
+
+        return {
+            "startergy": "ATM_DIFF_SELL",
+            "underlying": self.name,
+            "legs" : legs,
+            # perf_counter at creation, for signal -> execute latency
+            "signal_ts": time.perf_counter(),
+        }
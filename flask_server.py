@@ -1,11 +1,25 @@
-from flask import Flask, request
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, request, jsonify
+from requests.adapters import HTTPAdapter
+from core.metrics import METRICS
+import os
 import requests
+import time
+
+# ANGEL_ORDER_URL points the relay at a mock broker for load tests
+ORDER_URL = os.getenv("ANGEL_ORDER_URL", "https://apiconnect.angelone.in/rest/secure/angelbroking/order/v1/placeOrder")
+PORT = int(os.getenv("RELAY_PORT", "6000"))
 
 app=Flask(__name__)
 
-@app.route("/placeOrder",methods=['POST'])
-def auth():
-    data = request.get_json()
+# one pooled keep-alive session towards the broker for every request
+broker = requests.Session()
+broker.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=16))
+broker.verify = False
+leg_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="relay")
+
+
+def send_order(data):
     headers = {
         'Authorization': data.get('AUTH_TOKEN'),
         'Content-Type': 'application/json',
@@ -24,23 +38,88 @@ def auth():
         "producttype": "INTRADAY",
         "duration": "DAY",
         "price": "0",
-        "quantity": 65
+        "quantity": data['quantity']
     }
-    
-    r = requests.post(url="https://apiconnect.angelone.in/rest/secure/angelbroking/order/v1/placeOrder",
+
+    start = time.perf_counter()
+    r = broker.post(url=ORDER_URL,
                     headers=headers,
-                    params=payload,
-                    verify=False)
+                    params=payload)
+    METRICS.since("broker_response", start)
+    return r
+
+
+def leg_result(leg, r=None, error=None):
+    result = {"symbol": leg.get('symbol'), "token": leg.get('token'), "B_S": leg.get('B_S')}
+    if error is not None:
+        result.update(status=None, response=repr(error))
+        return result
+    try:
+        body = r.json()
+    except ValueError:
+        body = r.text
+    result.update(status=r.status_code, response=body)
+    return result
+
+
+def missing_quantity(legs):
+    """Legs without a quantity; the relay never picks a size on its own."""
+    return [leg.get('symbol') for leg in legs if not leg.get('quantity')]
+
+
+@app.route("/placeOrder",methods=['POST'])
+def auth():
+    data = request.get_json()
+    if missing_quantity([data]):
+        return jsonify({"error": "quantity is required"}), 400
+    r = send_order(data)
     print(r.status_code)
 
     return r.content
 
+
+@app.route("/placeOrders",methods=['POST'])
+def place_orders():
+    """Takes a whole trade_signal and sends every leg to the broker at once.
+    API/AUTH_TOKEN given at the top level apply to legs that don't carry their own."""
+    data = request.get_json()
+    legs = []
+    for leg in data.get('legs', []):
+        leg = dict(leg)
+        leg.setdefault('API', data.get('API'))
+        leg.setdefault('AUTH_TOKEN', data.get('AUTH_TOKEN'))
+        legs.append(leg)
+    missing = missing_quantity(legs)
+    if missing:
+        return jsonify({"error": f"quantity is required for {missing}"}), 400
+
+    futures = [leg_pool.submit(send_order, leg) for leg in legs]
+    results = []
+    for leg, f in zip(legs, futures):
+        try:
+            results.append(leg_result(leg, f.result()))
+        except Exception as e:
+            results.append(leg_result(leg, error=e))
+    print([r['status'] for r in results])
+
+    return jsonify({"strategy": data.get('startergy'), "results": results})
+
+@app.route('/metrics',methods=['GET'])
+def metrics():
+    return jsonify(METRICS.snapshot())
+
 @app.route('/test',methods=['GET'])
 def test():
     print("Flask app running successful")
     return "Hellloo World"
 
 
-app.run(host='0.0.0.0',port=6000,debug=True)
-    
+if __name__ == "__main__":
+    # RELAY_SERVER=dev keeps the old flask debug server, otherwise serve
+    # through waitress (same as `waitress-serve --port=6000 flask_server:app`)
+    if os.getenv("RELAY_SERVER") == "dev":
+        app.run(host='0.0.0.0',port=PORT,debug=True)
+    else:
+        from waitress import serve
+        serve(app, host='0.0.0.0', port=PORT, threads=16)
 
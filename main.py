@@ -9,10 +9,15 @@ from textual.widgets import  DataTable, Static, Button, Footer, RadioButton, Inp
 # from textual.reactive import reactive
 
 import os
+from concurrent.futures import Future
 
 from core.options_main import OptionTrader
 from core.TradeReplicator import Replicator
-from utils.auth_helper import authenticate_all_sequential
+from core.order_status import OrderStateTable, OrderStatusPoller
+from core.order_stream import OrderStream
+from core.metrics import METRICS, METRICS_PORT
+from utils.auth_helper import authenticate_all_concurrent
+from utils.render_scheduler import RenderScheduler
 
 accounts_dir = "home/accounts"
 
@@ -95,6 +100,7 @@ class AuthScreen(Screen):
     def on_mount(self) -> None:
     # ... create trader objects first ...
         self.master_trader = OptionTrader(f"{accounts_dir}/{self.app.selected_tuple[0]}")
+        self.master_trader.underlying_names = list(self.app.underlyings)
     
         self.child_traders = []
         
@@ -112,7 +118,7 @@ class AuthScreen(Screen):
                     self.status.write(f"[red]{trader.CLIENT} auth FAIL[/]: {err}")
             self.app.call_from_thread(apply)
         def _run_auth():
-            successes, failures = authenticate_all_sequential(self.master_trader, self.child_traders, _on_status, _on_result)
+            successes, failures = authenticate_all_concurrent(self.master_trader, self.child_traders, _on_status, _on_result)
             for tr in successes:
                 self.status.write(f"success list entries: {tr.name, tr.get_fund_details()}")
             self.query_one("#next").disabled = False
@@ -134,7 +140,10 @@ class TraderApp(Screen):
     
     BINDINGS = [
         Binding("s", "sell", "SELL item", show=True),
-        Binding("b", "buy", "BUY item", show=True)
+        Binding("b", "buy", "BUY item", show=True),
+        Binding("r", "render_stats", "UI stats", show=True),
+        Binding("m", "metrics", "Latency", show=True),
+        Binding("p", "positions", "Positions", show=True)
         
     ]
 
@@ -180,28 +189,59 @@ class TraderApp(Screen):
         yield Footer()
 
     def on_mount(self) -> None:
-        self.column_map = self.account_table.add_columns("Name","funds")
+        self.column_map = self.account_table.add_columns("Name","funds","MTM")
         
         for t in self.app.trader_obj:
             cash = float(t.get_fund_details())
             name =  max(t.name.split(), key=lambda s: len(s))
-            self.row_map = self.account_table.add_row(name,f"{cash:.2f}",key=t.name) 
+            self.row_map = self.account_table.add_row(name,f"{cash:.2f}","-",key=t.name) 
+        self.account_keys = {t.CLIENT: t.name for t in self.app.trader_obj}
         
         self.trader = self.app.trader_obj[0]
-        self.replicator = Replicator(
-            master=self.trader,
-            children=self.app.trader_obj[1:],
-            logger=lambda msg: self.app.call_from_thread(self.status.write,msg))
+        # every trader hook goes through the scheduler, flushed once per frame
+        self.render_scheduler = RenderScheduler(fps=self.app.render_fps)
+        self.render_scheduler.line_sink = self.status.write
+        self.set_interval(1 / self.render_scheduler.fps, self.render_scheduler.flush)
+        self.cells = {}
+        self.atm = None
+
+        if self.app.replication == "async":
+            from core.async_replicator import AsyncReplicator
+            self.replicator = AsyncReplicator(
+                master=self.trader,
+                children=self.app.trader_obj[1:],
+                logger=self.render_scheduler.write)
+        else:
+            self.replicator = Replicator(
+                master=self.trader,
+                children=self.app.trader_obj[1:],
+                logger=self.render_scheduler.write)
+        self.run_worker(self.replicator.warm_up, thread=True)
+
+        self.orders = OrderStateTable()
+        self.orders.listeners.append(self._on_order_update)
+        self.order_poller = OrderStatusPoller(self.orders)
+        self.order_poller.start()
+        self.trader.order_tracker = self.order_poller
+        self.replicator.orders = self.orders
+        # fills of every account, marked to market from the tick store
+        self.positions = self.trader.track_positions(self.orders)
+        # one thread services the order-update stream of every account
+        self.order_stream = OrderStream(self.orders, on_status=self.render_scheduler.write)
+        for t in self.app.trader_obj:
+            t.open_order_stream(self.order_stream)
         
         expiry_options = [(x,x) for x in self.trader.expiry_list]
         self.expiry_select.set_options(expiry_options)
         
         self.trader.auto_trade_enabled = self.app.enable_sell
-        self.trader.on_status = lambda text: self.app.call_from_thread(self._ui_status, text)
-        self.trader.on_tokens_changed = lambda atm, ce, pe: self.app.call_from_thread(self._ui_tokens_changed, atm, ce, pe)
-        self.trader.on_preview = lambda spot, preview_ce, preview_pe, preview_diff: self.app.call_from_thread(self._ui_preview, spot,preview_ce,preview_pe,preview_diff)
-        self.trader.on_table = lambda rows: self.app.call_from_thread(self._ui_ladder,rows)
-        self.trader.on_tile = lambda token,ltp,previous_close: self.app.call_from_thread(self._ui_tile,token,ltp,previous_close)
+        self.trader.on_status = self.render_scheduler.write
+        self.trader.on_tokens_changed = lambda atm, ce, pe: self.render_scheduler.submit("tokens", self._ui_tokens_changed, atm, ce, pe)
+        self.trader.on_preview = lambda spot, preview_ce, preview_pe, preview_diff: self.render_scheduler.submit("preview", self._ui_preview, spot,preview_ce,preview_pe,preview_diff)
+        self.trader.on_table = lambda rows: self.render_scheduler.submit("ladder", self._ui_ladder,rows)
+        self.trader.on_chains = lambda expiries: self.render_scheduler.submit("chains", self._ui_expiries, expiries)
+        self.trader.on_tile = lambda token,ltp,previous_close: self.render_scheduler.submit(("tile", token), self._ui_tile,token,ltp,previous_close)
+        self.trader.on_mtm = lambda mtm: self.render_scheduler.submit("mtm", self._ui_mtm, mtm)
         self.trader.on_trade_signal = self._on_trade_signal
 
         self.price_table.add_columns("current_atm","CE","PE","DIFF")
@@ -210,6 +250,18 @@ class TraderApp(Screen):
         self.price_table.add_row('-','-','-','-',key="preview")
         self.ladder_keys = []
 
+        # per stage p50/p99 as JSON on http://127.0.0.1:METRICS_PORT/metrics
+        try:
+            port = METRICS.serve(int(os.getenv("METRICS_PORT", METRICS_PORT)))
+            self.status.write(f"Latency metrics on http://127.0.0.1:{port}/metrics")
+        except OSError as e:
+            self.status.write(f"[red]metrics endpoint not started: {e}[/]")
+
+        self.trader.restore_snapshot()
+        # new scrip master every morning, swapped in without a restart
+        self.trader.start_rollover()
+        if self.app.record:
+            self.trader.start_recording(self.app.record)
         self.run_worker(self.trader.start_connection, thread=True, exclusive=True)
 
     # ---------- UI update handlers ----------
@@ -219,14 +271,26 @@ class TraderApp(Screen):
     def _ui_tokens_changed(self, atm: int, ce_token: str, pe_token: str):
         self.atm, self.ce_token, self.pe_token = atm, ce_token, pe_token
         try:
-            ce_symbol = self.trader.symbol_token_map.inv[str(ce_token)]
-            pe_symbol = self.trader.symbol_token_map.inv[str(pe_token)]
+            ce_symbol = self.trader.chain.symbol_of(ce_token)
+            pe_symbol = self.trader.chain.symbol_of(pe_token)
 
             # self.status.write(f"[blue]ATM[/] changed {atm}")
             
         except Exception as e:
             self.status.write(f"[red]UI token update failed: {e!r}[/]")
                 
+    def _ui_expiries(self, expiries):
+        self.expiry_select.set_options([(x,x) for x in expiries])
+        self.status.write(f"[cyan]Instruments refreshed[/], expiries {', '.join(expiries[:3])}")
+
+    def _ui_mtm(self, mtm):
+        for client, value in mtm.items():
+            key = self.account_keys.get(client)
+            if key is not None:
+                color = "green" if value >= 0 else "red"
+                self.render_scheduler.set_cell(self.account_table, self.cells, key, self.column_map[2],
+                                     f"[{color}]{value:.2f}[/]")
+
     def _ui_tile(self,token :str, ltp: float,previous_close: float):
         try:
             tile_1 = self.query_one('#tile_1')
@@ -253,7 +317,7 @@ class TraderApp(Screen):
             column_keys = list(self.price_table.columns.keys())
             
             for col_key, new_value in zip(column_keys, new_row_data):
-                self.price_table.update_cell("preview", col_key, new_value,update_width=True)
+                self.render_scheduler.set_cell(self.price_table, self.cells, "preview", col_key, new_value,update_width=True)
         except Exception as e:
             self.status.write(f"[red]UI diff update failed: {e!r}[/]")            
 
@@ -271,37 +335,61 @@ class TraderApp(Screen):
                     values = [Text(v, style="bold #186ac7") for v in values]
                 if key in table.rows:
                     for col,val in zip(table.columns.keys(),values):
-                        table.update_cell(key,col,val)
+                        self.render_scheduler.set_cell(table, self.cells, key, col, val)
                 else:
                     table.add_row(*values,key=key)
+                    for col,val in zip(table.columns.keys(),values):
+                        self.cells[(key, col)] = val
                     
             for old in list(self.ladder_keys):
                 if old not in new_keys and old in table.rows:
                     table.remove_row(old)
-                self.ladder_keys = new_keys
+                    for col in table.columns.keys():
+                        self.cells.pop((old, col), None)
+            self.ladder_keys = new_keys
             if cursor.row < table.row_count:
                 table.cursor_coordinate = cursor
                 
         except Exception as e:
             self.status.write(f"[red] Ladder update failed: {e!r}[/]")
 
+    def _on_order_update(self, orderid, state):
+        if state.get("status") in ("placed", "open", "pending"):
+            return
+        self.render_scheduler.write(f"{state.get('client')} {state.get('symbol')} {orderid}: "
+                          f"{state.get('status')} {state.get('text')}")
+
+    def _replicate(self, signal, force):
+        result = self.replicator.test(signal,force=force)
+        # result = self.replicator.execute(signal,force=force)
+        # AsyncReplicator only schedules the trade, a failure shows up on its Future
+        if isinstance(result, Future):
+            result.add_done_callback(self._on_replicated)
+
+    def _on_replicated(self, future):
+        if future.cancelled():
+            self.trader.on_status("[red]Replication cancelled[/]")
+        elif future.exception() is not None:
+            self.trader.on_status(f"[red]Replication failed: {future.exception()!r}[/]")
+
     def _on_trade_signal(self, signal: dict,force=False):
+        underlying = self.trader.underlyings.get(signal.get("underlying"), self.trader.underlying)
         if not force:
             if not self.app.enable_sell:
                 self._ui_status("[red] Auto trading diabled[/]")
                 return
-            if self.trader.trade_taken:
+            if underlying.trade_taken:
                 self._ui_status("[yellow]: Trade already taken [/]")
                 return
-        self.run_worker(lambda:self.replicator.test(signal,force=force),thread=True)
-        # self.run_worker(lambda:self.replicator.execute(signal,force=force),thread=True)
+        self.run_worker(lambda:self._replicate(signal,force),thread=True)
         
         if not force:
-            self.trader.trade_taken = True
+            underlying.trade_taken = True
 
     def get_spot_tokens(self,cell_coordinate : Coordinate):
         coordinate = Coordinate(cell_coordinate.row,0)
         spot_value = self.price_table.get_cell_at(coordinate)
+        spot_value = getattr(spot_value, "plain", spot_value)
         ce, pe = self.trader.get_ce_pe_tokens(spot_value)
         if cell_coordinate.column == 0:
             return (ce,pe)
@@ -317,6 +405,22 @@ class TraderApp(Screen):
             signal = self.trader.build_trade_signal([*tokens],"SELL")
             self._on_trade_signal(signal,force=True)
 
+    def action_render_stats(self) -> None:
+        self.status.write(f"[cyan]UI[/] {self.render_scheduler.summary()}")
+
+    def action_metrics(self) -> None:
+        self.status.write(f"[cyan]Latency[/]\n{METRICS.format() or 'no samples yet'}")
+
+    def action_positions(self) -> None:
+        lines = []
+        for client, book in self.positions.summary().items():
+            lines.append(f"[cyan]{client}[/] MTM {book['mtm']:.2f}")
+            for p in book["positions"]:
+                flag = "" if p["priced"] else " (no price)"
+                lines.append(f"  {p['symbol'] or p['token']}: {p['net_qty']:+d} "
+                             f"buy {p['buy_avg']:.2f} sell {p['sell_avg']:.2f} MTM {p['mtm']:.2f}{flag}")
+        self.status.write("\n".join(lines) or "no positions yet")
+
     def action_buy(self) -> None:
         coord = self.price_table.cursor_coordinate
         if coord:
@@ -345,8 +449,9 @@ class TraderApp(Screen):
                 
     @on(Select.Changed)
     def select_changed(self, event: Select.Changed) -> None:
-        self.trader.expiry = str(event.value)
-        self.trader.subscribe_strike_range(self.trader.current_atm)
+        if event.value is Select.BLANK or str(event.value) == self.trader.expiry:
+            return
+        self.trader.set_expiry(str(event.value))
 
     def _debug_eval(self,expr: str):
         try:
@@ -379,9 +484,16 @@ class TraderApp(Screen):
     # ---------- Shutdown ----------
     async def on_shutdown_request(self) -> None:
         self.trader.stop()
+        self.replicator.close()
+        self.order_poller.stop()
+        self.order_stream.stop()
 
     async def action_quit(self) -> None:
         self.trader.stop()
+        self.replicator.close()
+        self.order_poller.stop()
+        self.order_stream.stop()
+        METRICS.stop()
         self.app.exit()
 
 
@@ -389,11 +501,160 @@ class Final(App):
     selected_tuple = None
     trader_obj = []
     enable_sell = True
+    render_fps = 10
+    # first one is shown in the ladder, the rest trade headless on the same feed
+    underlyings = ("NIFTY",)
+    # "threads" (Replicator) or "async" (AsyncReplicator, needs aiohttp)
+    replication = os.getenv("REPLICATION", "threads")
+    # tick log (plus .tokens.json sidecar) for replay and backtests
+    record = os.getenv("RECORD_TICKS")
     def on_mount(self):
         self.push_screen(SelectionScreen())
         # self.push_screen(AuthScreen())
         
 
+class ObserverApp(App):
+    """Read-only ladder of a session started with `python -m core.multiproc`."""
+    BINDINGS = [Binding("q", "quit", "Quit", show=True)]
+
+    def __init__(self, master, underlyings):
+        super().__init__()
+        self.master = master
+        self.underlyings = underlyings
+
+    def compose(self) -> ComposeResult:
+        self.header = Static("attaching...")
+        yield self.header
+        self.price_table = DataTable(id="price-table")
+        yield self.price_table
+        yield Footer()
+
+    def on_mount(self) -> None:
+        from core.multiproc import Observer
+        self.observer = Observer(self.master, self.underlyings)
+        self.price_table.add_columns("strike","CE","PE","DIFF")
+        self.price_table.zebra_stripes = True
+        self.set_interval(0.5, self.refresh_ladder)
+
+    def refresh_ladder(self) -> None:
+        spot, atm, rows = self.observer.ladder()
+        if spot is None:
+            self.header.update("waiting for the feed")
+            return
+        self.header.update(f"{self.observer.trader.underlying.name} {spot:.2f}  ATM {atm}  "
+                           f"expiry {self.observer.trader.expiry}")
+        self.price_table.clear()
+        for strike, ce, pe, diff in rows:
+            values = (f"{strike}",f"{ce:.2f}",f"{pe:.2f}",f"{diff:.2f}")
+            if strike == atm:
+                values = [Text(v, style="bold #186ac7") for v in values]
+            self.price_table.add_row(*values)
+
+    def on_unmount(self) -> None:
+        self.observer.close()
+
+
+class RemoteApp(App):
+    """The TUI as a client of `python -m core.daemon`: ladder, status lines, buy/sell, auto trade."""
+    BINDINGS = [
+        Binding("s", "order('SELL')", "SELL strike", show=True),
+        Binding("b", "order('BUY')", "BUY strike", show=True),
+        Binding("a", "toggle_auto", "Auto trade", show=True),
+        Binding("q", "quit", "Quit", show=True),
+    ]
+
+    def __init__(self, url, token=None):
+        super().__init__()
+        from core.daemon import DaemonClient
+        self.client = DaemonClient(url, token)
+        self.last_event = 0
+        self.auto_trade = None
+
+    def compose(self) -> ComposeResult:
+        self.header = Static(f"connecting to {self.client.url}...")
+        yield self.header
+        with Horizontal():
+            self.price_table = DataTable(id="price-table", cursor_type="row")
+            yield self.price_table
+            self.status = RichLog(id="log", highlight=True, markup=True, wrap=False)
+            yield self.status
+        yield Footer()
+
+    def on_mount(self) -> None:
+        self.price_table.add_columns("strike","CE","PE","DIFF")
+        self.price_table.zebra_stripes = True
+        self.set_interval(0.5, lambda: self.run_worker(self._poll, thread=True, exclusive=True, group="poll"))
+
+    def _poll(self):
+        try:
+            status = self.client.status()
+            rows = self.client.ladder()
+            events = self.client.events(self.last_event)
+        except Exception as e:
+            self.call_from_thread(self.header.update, f"[red]daemon unreachable[/]: {e}")
+            return
+        self.call_from_thread(self._apply, status, rows, events)
+
+    def _apply(self, status, rows, events):
+        self.auto_trade = status["auto_trade"]
+        primary = next(iter(status["underlyings"].values()), {})
+        feed = "up" if status["feed"]["connected"] else "[red]down[/]"
+        self.header.update(
+            f"{status['name']} | spot {primary.get('spot')} ATM {primary.get('atm')} "
+            f"expiry {primary.get('expiry')} | feed {feed} | auto trade "
+            f"{'[green]on[/]' if self.auto_trade else '[red]off[/]'}"
+            f"{' (dry run)' if status['dry_run'] else ''} | pending orders {status['pending_orders']}")
+        cursor = self.price_table.cursor_coordinate
+        self.price_table.clear()
+        for strike, ce, pe, diff in rows:
+            values = (f"{strike}",f"{ce:.2f}",f"{pe:.2f}",f"{diff:.2f}")
+            if strike == primary.get("atm"):
+                values = [Text(v, style="bold #186ac7") for v in values]
+            self.price_table.add_row(*values)
+        if cursor.row < self.price_table.row_count:
+            self.price_table.cursor_coordinate = cursor
+        for event in events:
+            self.status.write(event["text"])
+            self.last_event = event["seq"]
+
+    def _call(self, fn, *args):
+        def run():
+            try:
+                result = fn(*args)
+                self.call_from_thread(self.status.write, f"[cyan]ok[/] {result}")
+            except Exception as e:
+                self.call_from_thread(self.status.write, f"[red]{e}[/]")
+        self.run_worker(run, thread=True)
+
+    def action_order(self, side: str) -> None:
+        if not self.price_table.row_count:
+            return
+        strike = self.price_table.get_row_at(self.price_table.cursor_coordinate.row)[0]
+        self._call(self.client.order, side, int(getattr(strike, "plain", strike)))
+
+    def action_toggle_auto(self) -> None:
+        if self.auto_trade is not None:
+            self._call(self.client.auto_trade, not self.auto_trade)
+
+
 if __name__ == "__main__":
-    Final().run()
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--observe", action="store_true", help="attach read-only to a core.multiproc session")
+    parser.add_argument("--master", help="master account env file, with --observe")
+    parser.add_argument("--underlying", action="append", help="same list as the session, with --observe")
+    parser.add_argument("--connect", help="control API of a running core.daemon, e.g. http://127.0.0.1:8700")
+    parser.add_argument("--token", help="control API token, with --connect")
+    parser.add_argument("--record", help="append every tick to this log (default $RECORD_TICKS)")
+    args = parser.parse_args()
+    if args.observe and not args.master:
+        parser.error("--observe needs --master, the session's master account env file")
+    if args.connect:
+        RemoteApp(args.connect, args.token).run()
+    elif args.observe:
+        ObserverApp(args.master, args.underlying or ["NIFTY"]).run()
+    else:
+        if args.record:
+            Final.record = args.record
+        Final().run()
 
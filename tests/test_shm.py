@@ -0,0 +1,53 @@
+"""An attach from another process must never unlink the session's blocks."""
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+import pytest
+
+pytest.importorskip("numpy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.shm import SpscQueue  # noqa: E402
+
+ATTACH = (
+    "import sys\n"
+    "from core.shm import SpscQueue\n"
+    "q = SpscQueue(sys.argv[1], capacity=8, record_size=64)\n"
+    "q.put(b'from child')\n"
+    "q.close()\n"
+)
+
+
+def attach_and_put(name):
+    q = SpscQueue(name, capacity=8, record_size=64)
+    q.put(b"from child")
+    q.close()
+
+
+def assert_block_survives(owner):
+    # the attaching process's resource tracker cleans up after it exits
+    time.sleep(1.0)
+    assert owner.get() == b"from child"
+    SpscQueue(owner.name, capacity=8, record_size=64).close()
+    owner.close()
+
+
+def test_attach_from_separate_process_keeps_block():
+    owner = SpscQueue(f"algo_test_{uuid.uuid4().hex[:8]}", capacity=8, record_size=64, create=True)
+    subprocess.run([sys.executable, "-c", ATTACH, owner.name], cwd=ROOT, check=True)
+    assert_block_survives(owner)
+
+
+def test_attach_from_spawned_worker_keeps_block():
+    owner = SpscQueue(f"algo_test_{uuid.uuid4().hex[:8]}", capacity=8, record_size=64, create=True)
+    worker = mp.get_context("spawn").Process(target=attach_and_put, args=(owner.name,))
+    worker.start()
+    worker.join(10)
+    assert worker.exitcode == 0
+    assert_block_survives(owner)
@@ -1,33 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import time
 import random
 
 RATE_LIMIT_HINTS = ("exceeding access rate", "rate", "429", "too many requests", "access denied")
 
+# SmartAPI documents loginByPassword at 1 request per second
+ANGEL_LOGIN_RATE = 1.0
+
 def is_rate_limit_error(e: Exception) -> bool:
     msg = str(e).lower()
     return any(h in msg for h in RATE_LIMIT_HINTS)
 
+def backoff_delay(attempt, base_delay=1.0):
+    # exponential backoff + jitter
+    return base_delay * (2 ** attempt) + random.uniform(0, 0.5)
+
+def try_restore(trader, on_status=None):
+    """Saved session still valid -> no login needed."""
+    try:
+        restored = trader.restore_session()
+    except Exception as e:
+        restored = False
+        if callable(on_status):
+            on_status(f"Session restore failed for {trader.CLIENT}: {e!r}")
+    if restored and callable(on_status):
+        on_status(f"Reused saved session for {trader.CLIENT}")
+    return restored
+
 def auth_with_backoff(trader, tries=5, base_delay=1.0, on_status=None):
+    if try_restore(trader, on_status):
+        return trader
     for attempt in range(tries):
         try:
             trader.authenticate()
             return trader
         except Exception as e:
             if is_rate_limit_error(e) and attempt < tries - 1:
-                # exponential backoff + jitter
-                delay = base_delay * (2 ** attempt) + random.uniform(0, 0.5)
+                delay = backoff_delay(attempt, base_delay)
                 if callable(on_status):
                     on_status(f"Rate limit for {trader.CLIENT}. Retry in {delay:.1f}s (attempt {attempt+1}/{tries})")
                 time.sleep(delay)
                 continue
             raise
 
+def start_token_load(master_obj, on_status=None):
+    """Instrument download and parse on its own thread, overlapping the logins."""
+    if callable(on_status):
+        on_status("Downloading Tokens")
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="instruments")
+    future = pool.submit(master_obj.loading_tokens)
+    pool.shutdown(wait=False)
+    return future
+
+def wait_token_load(future, on_status=None):
+    future.result()
+    if callable(on_status):
+        on_status("Tokens Loaded")
+
 def authenticate_all_sequential(master_obj, child_objs, on_status=None, on_result=None, delay_between=2.0):
     successes, failures = [], {}
     all_traders = [master_obj, *child_objs]
-    on_status("Downloading Tokens")
-    master_obj.loading_tokens()
-    on_status("Tokens Loaded")
+    tokens = start_token_load(master_obj, on_status)
     for idx, t in enumerate(all_traders):
         try:
             if callable(on_status):
@@ -42,7 +76,103 @@ def authenticate_all_sequential(master_obj, child_objs, on_status=None, on_resul
             if callable(on_result):
                 on_result(t, False, e)
 
+    wait_token_load(tokens, on_status)
     if callable(on_status):
         on_status("All accounts authenticated (sequential)")
     return successes, failures
 
+
+
+class TokenBucket:
+    """
+    Login limiter shared by every worker. A 429 halves the rate and pauses
+    the whole bucket for the backoff delay; each success wins back a tenth
+    of the configured rate.
+    """
+    def __init__(self, rate=ANGEL_LOGIN_RATE, capacity=1, min_rate=0.1):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.paused_until:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self.paused_until - now
+            time.sleep(wait)
+
+    def penalize(self, pause):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            self.updated = self.paused_until = max(self.paused_until, time.monotonic() + pause)
+
+    def reward(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+
+def auth_with_bucket(trader, bucket, tries=5, base_delay=1.0, on_status=None):
+    if try_restore(trader, on_status):
+        return trader
+    for attempt in range(tries):
+        bucket.acquire()
+        try:
+            trader.authenticate()
+            bucket.reward()
+            return trader
+        except Exception as e:
+            if is_rate_limit_error(e) and attempt < tries - 1:
+                delay = backoff_delay(attempt, base_delay)
+                bucket.penalize(delay)
+                if callable(on_status):
+                    on_status(f"Rate limit for {trader.CLIENT}. Login rate now {bucket.rate:.2f}/s (attempt {attempt+1}/{tries})")
+                continue
+            raise
+
+def authenticate_all_concurrent(master_obj, child_objs, on_status=None, on_result=None, max_workers=4, rate=ANGEL_LOGIN_RATE):
+    """
+    Logs every account in as fast as the login limit allows: workers run
+    generateSession in parallel and only the shared bucket spaces them out.
+    Successes keep the master-first order of the input.
+    """
+    all_traders = [master_obj, *child_objs]
+    bucket = TokenBucket(rate=rate)
+    tokens = start_token_load(master_obj, on_status)
+
+    def run(t):
+        if callable(on_status):
+            on_status(f"Authenticating {t.CLIENT}...")
+        try:
+            auth_with_bucket(t, bucket, tries=5, base_delay=1.0, on_status=on_status)
+        except Exception as e:
+            if callable(on_result):
+                on_result(t, False, e)
+            return e
+        if callable(on_result):
+            on_result(t, True, None)
+        return None
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="auth") as pool:
+        errors = list(pool.map(run, all_traders))
+
+    successes = [t for t, e in zip(all_traders, errors) if e is None]
+    failures = {t: e for t, e in zip(all_traders, errors) if e is not None}
+    if callable(on_status):
+        on_status(f"All accounts authenticated (concurrent) in {time.monotonic() - start:.1f}s")
+    wait_token_load(tokens, on_status)
+    return successes, failures
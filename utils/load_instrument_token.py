@@ -1,54 +1,223 @@
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from bidict import bidict
 from glob import glob
+import codecs
 import os
+import shutil
+import numpy as np
 import pandas as pd
 import requests,json
 
+INSTRUMENT_URL = "https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json"
+CACHE_DIR = "instrument_cache"
+# what goes into the cache unless a caller asks for more
+INSTRUMENT_TYPES = ("OPTIDX",)
 
-def load_options_token():
-    files = glob("tickers*") 
-    formatted_today = datetime.today().date().strftime("%d%m%Y")
-    
+# columns kept from the scrip master, as a numpy structured array.
+# rows are sorted by (name, instrumenttype) so every partition is one
+# contiguous slice that can be read out of a memory map.
+CACHE_DTYPE = np.dtype([
+    ("token", "S16"),
+    ("symbol", "S48"),
+    ("name", "S24"),
+    ("expiry", "datetime64[D]"),
+    ("strike", "f8"),
+    ("lotsize", "i4"),
+    ("instrumenttype", "S12"),
+    ("exch_seg", "S8"),
+    ("tick_size", "f8"),
+])
+
+
+def cache_path(day=None):
+    day = day or datetime.today().date().strftime("%d%m%Y")
+    return os.path.join(CACHE_DIR, day)
+
+
+@contextmanager
+def open_instrument_stream(source=INSTRUMENT_URL):
+    """Binary stream of the scrip master, `source` can be a local file for tests."""
+    if os.path.exists(source):
+        with open(source, "rb") as file:
+            yield file
+        return
+    response = requests.get(source, stream=True, verify=False, timeout=60)
+    try:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        yield response.raw
+    finally:
+        response.close()
+
+
+def iter_instruments(source=INSTRUMENT_URL, chunk_size=1 << 20):
+    """
+    Rows of the scrip master one dict at a time. The body is read in
+    chunks and decoded object by object, so neither the whole document nor
+    the whole list is ever in memory.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    with open_instrument_stream(source) as stream:
+        buf, pos, eof = "", 0, False
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,[":
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # the next object runs past what has been read so far
+                if eof:
+                    if buf[pos:].strip():
+                        raise
+                    return
+                chunk = stream.read(chunk_size)
+                eof = not chunk
+                buf, pos = buf[pos:] + utf8.decode(chunk, final=eof), 0
+                continue
+            pos = end
+            yield item
+
+
+def _number(value):
     try:
-        with open(f"tickers_{formatted_today}.json", "r") as file:
-            instrument_list= json.load(file)
-            
-    except FileNotFoundError:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _record(item, expiries):
+    expiry = item.get("expiry") or ""
+    day = expiries.get(expiry)
+    if day is None:
         try:
-            os.remove(files[0])
-            print(f"'{files}' has been removed successfully.")
-        except Exception as e:
-            print(f"Error: '{e}'")
-            
-        with open(f"tickers_{formatted_today}.json", 'w') as json_file:
-            instrument_url = "https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json"
-            response = requests.get(instrument_url,verify=False)
-            instrument_list = response.json()
-            json.dump(instrument_list, json_file, indent=4)
-            
-    df = pd.DataFrame(instrument_list)
-    df = df[ (df['name'] == "NIFTY") & (df['instrumenttype'] == "OPTIDX")].copy()
-    
-    df["expiry"] = pd.to_datetime(df['expiry'],format="%d%b%Y")
-    df['strike'] = df['strike'].astype(float) / 100
-    
+            day = np.datetime64(datetime.strptime(expiry, "%d%b%Y").date(), "D")
+        except ValueError:
+            day = np.datetime64("NaT", "D")
+        expiries[expiry] = day
+    return (
+        str(item.get("token") or "").encode(),
+        str(item.get("symbol") or "").encode(),
+        str(item.get("name") or "").encode(),
+        day,
+        _number(item.get("strike")) / 100,
+        int(_number(item.get("lotsize"))),
+        str(item.get("instrumenttype") or "").encode(),
+        str(item.get("exch_seg") or "").encode(),
+        _number(item.get("tick_size")),
+    )
+
+
+def build_instrument_cache(instrument_list, path, types=INSTRUMENT_TYPES, names=None):
+    """
+    instrument_list: any iterable of scrip master dicts (iter_instruments()
+    streams one). Only rows whose instrumenttype is in `types` and, unless
+    `names` is None, whose name is in `names` are kept.
+    """
+    types = set(types) if types is not None else None
+    names = set(names) if names is not None else None
+    expiries = {}
+    rows = [_record(item, expiries) for item in instrument_list
+            if (types is None or item.get("instrumenttype") in types)
+            and (names is None or item.get("name") in names)]
+    records = np.array(rows, dtype=CACHE_DTYPE)
+    del rows
+    records = records[np.lexsort((records["instrumenttype"], records["name"]))]
+
+    index = {}
+    keys = np.char.add(np.char.add(records["name"], b"|"), records["instrumenttype"])
+    if len(keys):
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        stops = np.r_[starts[1:], len(keys)]
+        index = {keys[a].decode(): [int(a), int(b)] for a, b in zip(starts, stops)}
+    # what this cache was filtered on, so a wider request rebuilds it
+    index["__types__"] = sorted(types) if types is not None else None
+    index["__names__"] = sorted(names) if names is not None else None
+
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "instruments.npy.tmp"), "wb") as file:
+        np.save(file, records)
+    os.replace(os.path.join(path, "instruments.npy.tmp"), os.path.join(path, "instruments.npy"))
+    with open(os.path.join(path, "index.json.tmp"), "w") as file:
+        json.dump(index, file)
+    os.replace(os.path.join(path, "index.json.tmp"), os.path.join(path, "index.json"))
+
+
+def _covers(index, name, instrumenttype):
+    types, names = index.get("__types__"), index.get("__names__")
+    return (types is None or instrumenttype in types) and (names is None or name in names)
+
+
+def load_partition(name, instrumenttype, path=None, source=INSTRUMENT_URL):
+    """Rows for one (name, instrumenttype) pair, building today's cache first if needed."""
+    path = path or cache_path()
+    index = None
+    if os.path.exists(os.path.join(path, "index.json")):
+        with open(os.path.join(path, "index.json"), "r") as file:
+            index = json.load(file)
+    else:
+        # earlier days' caches next to this one, never anything else
+        for old in glob(os.path.join(os.path.dirname(os.path.abspath(path)), "*")):
+            if os.path.abspath(old) == os.path.abspath(path):
+                continue
+            try:
+                shutil.rmtree(old)
+                print(f"'{old}' has been removed successfully.")
+            except Exception as e:
+                print(f"Error: '{e}'")
+
+    if index is None or not _covers(index, name, instrumenttype):
+        types = set(INSTRUMENT_TYPES) | {instrumenttype}
+        if index is not None and index.get("__types__") is not None:
+            types |= set(index["__types__"])
+        build_instrument_cache(iter_instruments(source), path, types=types)
+        with open(os.path.join(path, "index.json"), "r") as file:
+            index = json.load(file)
+
+    start, stop = index.get(f"{name}|{instrumenttype}", (0, 0))
+    records = np.load(os.path.join(path, "instruments.npy"), mmap_mode="r")
+    return np.array(records[start:stop])
+
+
+def partition_frame(records):
+    df = pd.DataFrame({field: records[field] for field in CACHE_DTYPE.names})
+    for field in CACHE_DTYPE.names:
+        if CACHE_DTYPE[field].kind == "S":
+            df[field] = df[field].str.decode("utf-8")
+    return df
+
+
+def load_options_frame(name="NIFTY", path=None, source=INSTRUMENT_URL):
+    """Index options of `name` expiring in the next 30 days."""
+    df = partition_frame(load_partition(name, "OPTIDX", path=path, source=source))
+
+    df["expiry"] = pd.to_datetime(df['expiry'])
+
     today = pd.Timestamp.today().normalize()
     max_date = today + pd.Timedelta(days=30)
-    df = df[(df['expiry'] >= today) & (df['expiry'] <= max_date)]
-    
+    return df[(df['expiry'] >= today) & (df['expiry'] <= max_date)]
+
+
+def options_token_maps(df):
     # current_expiry = df['expiry'].min()
-    
+
     sorted_dates = sorted(df['expiry'].unique())
     expiry_list = [d.strftime('%d%b%y').upper() for d in sorted_dates]
-    
+
     symbol_token_map = bidict(zip(df['symbol'], df['token']))
-    
-    return expiry_list, symbol_token_map 
+
+    return expiry_list, symbol_token_map
+
+
+def load_options_token(name="NIFTY", path=None, source=INSTRUMENT_URL):
+    return options_token_maps(load_options_frame(name, path=path, source=source))
 
 def get_current_expiry():
     today = datetime.today().date()
     days_to_tuesday = (1-today.weekday()) % 7
     current_week_expiry = pd.to_datetime(today+timedelta(days=days_to_tuesday)).strftime('%d%b%y').upper()
-    
+
     return current_week_expiry
@@ -0,0 +1,71 @@
+from threading import Lock
+
+
+class RenderScheduler:
+    """
+    Sits between OptionTrader's on_* hooks and the Textual screen.
+
+    Hooks fire on the websocket/worker threads and only store the latest
+    value per key (a ladder, a tile, the preview row). The screen calls
+    flush() on its own thread at `fps`, so one frame applies everything in a
+    single batch instead of one call_from_thread per tick. Status lines are
+    kept in order, but only the newest `max_lines` survive a frame.
+    """
+    def __init__(self, fps=10, max_lines=200):
+        self.fps = fps
+        self.max_lines = max_lines
+        self.lock = Lock()
+        self.pending = {}
+        self.lines = []
+        self.line_sink = None
+        self.stats = {
+            "submitted": 0,     # updates handed in by producers
+            "coalesced": 0,     # replaced by a newer value before a frame
+            "dropped": 0,       # status lines over max_lines in one frame
+            "unchanged": 0,     # cells skipped because the value didn't change
+            "cells": 0,         # cells actually written
+            "frames": 0,
+        }
+
+    def submit(self, key, fn, *args):
+        with self.lock:
+            self.stats["submitted"] += 1
+            if key in self.pending:
+                self.stats["coalesced"] += 1
+            self.pending[key] = (fn, args)
+
+    def write(self, line):
+        with self.lock:
+            self.stats["submitted"] += 1
+            self.lines.append(line)
+            if len(self.lines) > self.max_lines:
+                del self.lines[0]
+                self.stats["dropped"] += 1
+
+    def flush(self):
+        """Runs on the UI thread."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            lines, self.lines = self.lines, []
+        if not pending and not lines:
+            return
+        self.stats["frames"] += 1
+        if lines and callable(self.line_sink):
+            for line in lines:
+                self.line_sink(line)
+        for fn, args in pending.values():
+            fn(*args)
+
+    def set_cell(self, table, cache, row_key, col_key, value, **kwargs):
+        """update_cell only when the value differs from what is on screen."""
+        if cache.get((row_key, col_key)) == value:
+            self.stats["unchanged"] += 1
+            return
+        cache[(row_key, col_key)] = value
+        table.update_cell(row_key, col_key, value, **kwargs)
+        self.stats["cells"] += 1
+
+    def summary(self):
+        s = self.stats
+        return (f"frames {s['frames']} | in {s['submitted']} | coalesced {s['coalesced']} | "
+                f"dropped {s['dropped']} | cells {s['cells']} | unchanged {s['unchanged']}")